@@ -1,6 +1,16 @@
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
+from rest_framework.filters import OrderingFilter
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import (
+    Favorites,
+    Ingredient,
+    Recipe,
+    RecipeTag,
+    ShoppingCart,
+)
+from recipes.search import search_recipes
+from recipes.tag_slugs import get_tag_choices, get_tag_ids
 
 
 class IngredientFilter(filters.FilterSet):
@@ -13,45 +23,76 @@ class IngredientFilter(filters.FilterSet):
         fields = ('name',)
 
 
-class RecipeFilter(filters.FilterSet):
+class TagSlugsFilter(filters.MultipleChoiceFilter):
+    """Отбор рецептов, у которых есть хотя бы один из тегов.
+
+    Слаги проверяются и переводятся в id по кешированному справочнику,
+    а условие строится через EXISTS, поэтому рецепты не дублируются.
+    Слаги тегов, удаленных или переименованных после проверки,
+    пропускаются.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('choices', get_tag_choices)
+        super().__init__(*args, **kwargs)
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        tag_ids = get_tag_ids()
+        return qs.filter(
+            Exists(
+                RecipeTag.objects.filter(
+                    recipe=OuterRef('pk'),
+                    tag_id__in=[
+                        tag_ids[slug] for slug in value if slug in tag_ids
+                    ],
+                )
+            )
+        )
+
+
+class RecipeTagFilter(filters.FilterSet):
     author = filters.NumberFilter(field_name='author__id', lookup_expr='exact')
+    tags = TagSlugsFilter()
+    search = filters.CharFilter(method='filter_search')
+
+    class Meta:
+        model = Recipe
+        fields = ('author', 'tags',)
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+
+class RecipeFilter(RecipeTagFilter):
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        queryset=Tag.objects.all(),
-        to_field_name='slug',
-        conjoined=False,
-    )
 
     class Meta:
         model = Recipe
         fields = ['author', 'tags', 'is_favorited', 'is_in_shopping_cart']
 
+    def filter_user_recipes(self, queryset, model, value):
+        in_list = Exists(
+            model.objects.filter(recipe=OuterRef('pk'), user=self.request.user)
+        )
+        return queryset.filter(in_list if value else ~in_list)
+
     def filter_is_favorited(self, queryset, name, value):
-        user = self.request.user
-        if value:
-            return queryset.filter(favorited__user=user)
-        return queryset.exclude(favorited__user=user)
+        return self.filter_user_recipes(queryset, Favorites, value)
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
-        user = self.request.user
-        if value:
-            return queryset.filter(in_shopping_cart__user=user)
-        return queryset.exclude(in_shopping_cart__user=user)
+        return self.filter_user_recipes(queryset, ShoppingCart, value)
 
 
-class RecipeTagFilter(filters.FilterSet):
-    author = filters.NumberFilter(field_name='author__id', lookup_expr='exact')
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        queryset=Tag.objects.all(),
-        to_field_name='slug',
-        conjoined=False,
-    )
+class RecipeOrderingFilter(OrderingFilter):
+    """Сортировка рецептов с добавлением id для однозначного порядка."""
 
-    class Meta:
-        model = Recipe
-        fields = ('author', 'tags',)
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering and request.query_params.get(self.ordering_param):
+            return (*ordering, '-id')
+        return ordering
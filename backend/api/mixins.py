@@ -1,3 +1,17 @@
+import hashlib
+
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag, urlencode
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from recipes.cache import get_version
+from recipes.constants import CATALOG_CACHE_TIMEOUT, RESPONSE_CACHE_TIMEOUT
+from users.models import Follow
+
+
 class MultiSerializerMixin:
     """Миксин для выбора сериалайзера из словаря `serializer_classes`."""
 
@@ -13,3 +27,123 @@ class MultiSerializerMixin:
             return self.serializer_classes[self.action]
         except KeyError:
             return super().get_serializer_class()
+
+
+class SubscribedMixin:
+    """Миксин для поля `is_subscribed` сериалайзеров пользователей.
+
+    Идентификаторы авторов, на которых подписан текущий пользователь,
+    загружаются одним запросом и сохраняются в объекте запроса, поэтому
+    все сериалайзеры, участвующие в обработке запроса, отвечают на
+    вопрос о подписке без обращения к базе данных.
+    """
+
+    def get_following_ids(self):
+        """Возвращает id авторов, на которых подписан пользователь."""
+        request = self.context['request']
+        following_ids = getattr(request, '_following_ids', None)
+        if following_ids is None:
+            following_ids = set()
+            if request.user.is_authenticated:
+                following_ids = set(
+                    Follow.objects.filter(user=request.user).values_list(
+                        'following_id', flat=True
+                    )
+                )
+            request._following_ids = following_ids
+        return following_ids
+
+    def get_is_subscribed(self, following):
+        return following.pk in self.get_following_ids()
+
+
+class CatalogCacheMixin:
+    """Миксин для кеширования полного списка объектов справочника.
+
+    Список без параметров запроса сериализуется один раз для каждой
+    версии справочника `catalog_name` и хранится в кеше готовым телом
+    ответа вместе со строгим ETag. На условные запросы с совпадающим
+    If-None-Match возвращается 304 Not Modified без тела.
+    """
+
+    catalog_name = None
+
+    def get_catalog_response(self, request, *args, **kwargs):
+        """Возвращает тело ответа и ETag текущей версии справочника."""
+        key = 'catalog:{}:{}'.format(
+            self.catalog_name, get_version(self.catalog_name)
+        )
+        cached = cache.get(key)
+        if cached is None:
+            response = super().list(request, *args, **kwargs)
+            body = JSONRenderer().render(response.data)
+            cached = (body, quote_etag(hashlib.sha256(body).hexdigest()))
+            cache.set(key, cached, CATALOG_CACHE_TIMEOUT)
+        return cached
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params or request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+        body, etag = self.get_catalog_response(request, *args, **kwargs)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response.headers['ETag'] = etag
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+
+class AnonymousCacheMixin:
+    """Миксин для кеширования ответов анонимным пользователям.
+
+    Ответы на `list` и `retrieve` для неавторизованных пользователей
+    хранятся в кеше по ключу из пути и нормализованной строки запроса.
+    В ключ входит версия данных `cache_generation`, которую сигналы
+    меняют при изменении данных, поэтому устаревшие ответы перестают
+    использоваться во всех процессах с общим бэкендом кеширования.
+    """
+
+    cache_generation = None
+
+    def get_response_cache_key(self, request):
+        query = urlencode(
+            sorted(
+                (key, sorted(values))
+                for key, values in request.query_params.lists()
+            ),
+            doseq=True,
+        )
+        key = '{}|{}|{}'.format(
+            request.build_absolute_uri(request.path),
+            query,
+            get_version(self.cache_generation),
+        )
+        return 'response:{}:{}'.format(
+            self.cache_generation, hashlib.md5(key.encode()).hexdigest()
+        )
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        if (
+            request.user.is_authenticated
+            or request.accepted_renderer.format != 'json'
+        ):
+            return handler(request, *args, **kwargs)
+        key = self.get_response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, RESPONSE_CACHE_TIMEOUT)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
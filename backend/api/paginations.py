@@ -1,6 +1,15 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+from datetime import datetime
 
-from recipes.constants import MAX_PAGE_SIZE, PAGE_SIZE
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from recipes import feed
+from recipes.constants import MAX_PAGE_SIZE, NUMBER_OF_RECIPES, PAGE_SIZE
 
 
 class UserRecipePagination(PageNumberPagination):
@@ -9,3 +18,163 @@ class UserRecipePagination(PageNumberPagination):
     page_query_param = 'page'
     page_size_query_param = 'limit'
     max_page_size = MAX_PAGE_SIZE
+
+
+class RecipeCursorPagination(BasePagination):
+    """Пагинация рецептов по курсору.
+
+    Рецепты упорядочены по убыванию пары (pub_date, id), курсор хранит
+    эту пару для границы страницы. Страница выбирается условием по
+    индексу без OFFSET, количество рецептов не считается, поэтому время
+    выборки не зависит от глубины страницы.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size = PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        """Возвращает (reverse, pub_date, id) из курсора или None."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            reverse, pub_date, pk = (
+                base64.urlsafe_b64decode(encoded.encode())
+                .decode()
+                .split('|')
+            )
+            return reverse == 'r', datetime.fromisoformat(pub_date), int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, reverse, recipe):
+        """Курсор для границы страницы на рецепте `recipe`."""
+        cursor = '|'.join(
+            (
+                'r' if reverse else 'f',
+                recipe.pub_date.isoformat(),
+                str(recipe.pk),
+            )
+        )
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            base64.urlsafe_b64encode(cursor.encode()).decode(),
+        )
+
+    def get_rows(self, queryset, request, boundary, reverse, limit):
+        """Рецепты после границы (pub_date, id) в порядке обхода."""
+        if boundary is not None:
+            pub_date, pk = boundary
+            lookup = 'gt' if reverse else 'lt'
+            queryset = queryset.filter(
+                Q(**{f'pub_date__{lookup}': pub_date})
+                | Q(pub_date=pub_date, **{f'pk__{lookup}': pk})
+            )
+        if reverse:
+            queryset = queryset.order_by('pub_date', 'pk')
+        else:
+            queryset = queryset.order_by('-pub_date', '-pk')
+        return list(queryset[:limit])
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor[0]
+        page = self.get_rows(
+            queryset,
+            request,
+            cursor and cursor[1:],
+            reverse,
+            page_size + 1,
+        )
+        has_more = len(page) > page_size
+        self.page = page[:page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(False, self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(True, self.page[0])
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link(),
+                'results': data,
+            }
+        )
+
+
+class FeedPagination(RecipeCursorPagination):
+    """Пагинация ленты подписок по курсору.
+
+    Границы страницы берутся из ленты пользователя, из переданного
+    queryset загружаются только рецепты страницы.
+    """
+
+    def get_rows(self, queryset, request, boundary, reverse, limit):
+        ids = feed.get_page(request.user.id, boundary, reverse, limit)
+        recipes = queryset.in_bulk(ids)
+        return [recipes[pk] for pk in ids if pk in recipes]
+
+
+class RecipePagination(UserRecipePagination):
+    """Пагинация списка рецептов.
+
+    По умолчанию постраничная, с параметрами `page` и `limit`.
+    При наличии параметра `cursor` (в том числе пустого, для первой
+    страницы) используется пагинация по курсору без подсчета количества.
+    """
+
+    cursor_pagination_class = RecipeCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_pagination = None
+        cursor_param = self.cursor_pagination_class.cursor_query_param
+        if cursor_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+        self.cursor_pagination = self.cursor_pagination_class()
+        return self.cursor_pagination.paginate_queryset(
+            queryset, request, view
+        )
+
+    def get_paginated_response(self, data):
+        if self.cursor_pagination is None:
+            return super().get_paginated_response(data)
+        return self.cursor_pagination.get_paginated_response(data)
+
+
+def get_recipes_limit(request):
+    """Количество рецептов автора в выдаче.
+
+    Берется из параметра запроса `recipes_limit`, при его отсутствии
+    или некорректном значении используется значение по умолчанию.
+    """
+    try:
+        recipes_limit = int(request.query_params['recipes_limit'])
+    except (KeyError, ValueError):
+        return NUMBER_OF_RECIPES
+    return max(recipes_limit, 0)
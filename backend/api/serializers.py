@@ -1,41 +1,85 @@
-import base64
+from functools import partial
 
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
-from django.core.paginator import Paginator
-from django.shortcuts import get_object_or_404
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from djoser.serializers import UserSerializer as BaseUserSerializer
 from rest_framework import serializers
 
-from recipes import constants
+from api.mixins import SubscribedMixin
+from api.paginations import get_recipes_limit
+from api.utils import decode_base64_image
+from recipes import constants, shopping_list
+from recipes.cache import bump_version
 from recipes.models import (
     Ingredient,
     IngredientInRecipe,
     Recipe,
+    RecipeTag,
+    ShoppingListItem,
     Tag,
 )
-from recipes.utils import generate_random_str
 
 User = get_user_model()
 
 
 class Base64ImageField(serializers.ImageField):
-    """Поле для загрузки изображений в формате base64."""
+    """Поле для загрузки изображений в формате base64.
+
+    Изображение проверяется при декодировании, поэтому повторная
+    проверка ImageField, читающая файл в память целиком, пропускается.
+    """
 
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
+            return serializers.FileField.to_internal_value(
+                self, decode_base64_image(data)
+            )
+        return super().to_internal_value(data)
 
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
 
-        return super().to_internal_value(data)
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии изображения.
+
+    По умолчанию возвращает миниатюру, с srcset=True — значения атрибута
+    srcset для каждого формата.
+    """
+
+    def __init__(self, srcset=False, **kwargs):
+        self.srcset = srcset
+        super().__init__(**kwargs)
+
+    def get_url(self, name):
+        url = default_storage.url(name)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def to_representation(self, variants):
+        if self.srcset:
+            return {
+                extension: ', '.join(
+                    f'{self.get_url(name)} {width}w'
+                    for width, name in sorted(
+                        names.items(), key=lambda item: int(item[0])
+                    )
+                )
+                for extension, names in variants.items()
+            }
+        names = variants.get(constants.IMAGE_THUMB_FORMAT)
+        if not names:
+            return None
+        return self.get_url(names[min(names, key=int)])
 
 
-class UserSerializer(BaseUserSerializer):
+class UserSerializer(SubscribedMixin, BaseUserSerializer):
     """Сериализатор для пользователей."""
 
     avatar = Base64ImageField(required=False, allow_null=True)
+    avatar_thumb = ImageVariantsField(source='avatar_variants')
+    avatar_srcset = ImageVariantsField(source='avatar_variants', srcset=True)
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -48,11 +92,8 @@ class UserSerializer(BaseUserSerializer):
             'last_name',
             'is_subscribed',
             'avatar',
-        )
-
-    def get_is_subscribed(self, following):
-        return self.context['request'].user in User.objects.filter(
-            followers__following=following
+            'avatar_thumb',
+            'avatar_srcset',
         )
 
 
@@ -141,6 +182,8 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     ingredients = AmountSerializer(many=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_thumb = ImageVariantsField(source='image_variants')
+    image_srcset = ImageVariantsField(source='image_variants', srcset=True)
 
     class Meta:
         model = Recipe
@@ -153,26 +196,38 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_thumb',
+            'image_srcset',
             'text',
             'cooking_time',
         )
 
     def get_is_favorited(self, obj):
-        return self.context['request'].user in User.objects.filter(
-            favorited__recipe=obj
+        is_favorited = getattr(obj, 'is_favorited', None)
+        if is_favorited is not None:
+            return is_favorited
+        user = self.context['request'].user
+        return (
+            user.is_authenticated
+            and obj.favorited.filter(user=user).exists()
         )
 
     def get_is_in_shopping_cart(self, obj):
-        return self.context['request'].user in User.objects.filter(
-            in_shopping_cart__recipe=obj
+        is_in_shopping_cart = getattr(obj, 'is_in_shopping_cart', None)
+        if is_in_shopping_cart is not None:
+            return is_in_shopping_cart
+        user = self.context['request'].user
+        return (
+            user.is_authenticated
+            and obj.in_shopping_cart.filter(user=user).exists()
         )
 
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
     """Сериализатор для рецептов."""
 
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), required=True, many=True
+    tags = serializers.ListField(
+        child=serializers.IntegerField(), required=True
     )
     ingredients = AmountShortSerializer(many=True)
     image = Base64ImageField()
@@ -201,61 +256,155 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             errors.append('Список тегов пуст.')
         if 'ingredients' in attrs:
             ingredients = attrs.get('ingredients')
-            ingredient_set = {
+            ingredient_ids = [
                 ingredient['ingredient'] for ingredient in ingredients
-            }
-            if len(ingredients) != len(ingredient_set):
+            ]
+            if len(ingredient_ids) != len(set(ingredient_ids)):
                 errors.append('Ингредиенты повторяются.')
-            for ingredient in ingredient_set:
-                if not Ingredient.objects.filter(id=ingredient).exists():
-                    errors.append(f'Ингредиента {ingredient} не существует.')
+            ingredient_objects = Ingredient.objects.in_bulk(ingredient_ids)
+            missing = self.get_missing_ids(ingredient_ids, ingredient_objects)
+            if missing:
+                errors.append(f'Ингредиентов {missing} не существует.')
         if 'tags' in attrs:
-            tags = attrs.get('tags')
-            if len(tags) != len(set(tags)):
+            tag_ids = attrs.get('tags')
+            if len(tag_ids) != len(set(tag_ids)):
                 errors.append('Теги повторяются.')
+            tag_objects = Tag.objects.in_bulk(tag_ids)
+            missing = self.get_missing_ids(tag_ids, tag_objects)
+            if missing:
+                errors.append(f'Тегов {missing} не существует.')
         if errors:
             raise serializers.ValidationError({'errors': errors})
+        for ingredient in attrs['ingredients']:
+            ingredient['ingredient'] = ingredient_objects[
+                ingredient['ingredient']
+            ]
+        attrs['tags'] = [tag_objects[tag_id] for tag_id in tag_ids]
         return super().validate(attrs)
 
+    @staticmethod
+    def get_missing_ids(ids, objects):
+        """Перечисление через запятую id, для которых нет объектов."""
+        return ', '.join(
+            str(object_id)
+            for object_id in dict.fromkeys(ids)
+            if object_id not in objects
+        )
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
         author = self.context['request'].user
         validated_data['author'] = author
-        validated_data['short_link'] = generate_random_str(
-            constants.LENGTH_SHORT_LINK
-        )
         recipe = Recipe.objects.create(**validated_data)
-        for ingredient in ingredients:
-            amount = ingredient['amount']
-            ingredient_object = get_object_or_404(
-                Ingredient, id=ingredient['ingredient']
-            )
-            ingr_in_recipe, st = IngredientInRecipe.objects.get_or_create(
-                ingredient=ingredient_object, recipe=recipe, amount=amount
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(
+                recipe=recipe,
+                ingredient=ingredient['ingredient'],
+                amount=ingredient['amount'],
             )
-        recipe.tags.set(tags)
+            for ingredient in ingredients
+        )
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=recipe, tag=tag) for tag in tags
+        )
+        transaction.on_commit(
+            partial(bump_version, constants.RECIPES_GENERATION)
+        )
+        recipe.is_favorited = recipe.is_in_shopping_cart = False
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop('ingredients')
-        tags = validated_data.pop('tags')
-        instance.ingredients.all().delete()
-        for ingredient in ingredients:
-            amount = ingredient['amount']
-            ingr_obj = get_object_or_404(
-                Ingredient, id=ingredient['ingredient']
+        """Обновление рецепта.
+
+        Ингредиенты записываются массовыми запросами без сигналов
+        моделей, поэтому сводные списки покупок обновляются явно в той же
+        транзакции. Версию данных рецептов меняет сигнал сохранения
+        рецепта.
+        """
+        deltas = self.update_ingredients(
+            instance, validated_data.pop('ingredients')
+        )
+        self.update_tags(instance, validated_data.pop('tags'))
+        recipe = super().update(
+            instance=instance, validated_data=validated_data
+        )
+        shopping_list.change_recipe(recipe.id, deltas)
+        return recipe
+
+    @staticmethod
+    def update_ingredients(recipe, ingredients):
+        """Приводит ингредиенты рецепта к новому списку.
+
+        Удаляются только исчезнувшие строки, обновляются строки
+        с изменившимся количеством, добавляются новые, совпадающие
+        строки не затрагиваются. Возвращает изменения количеств
+        ингредиентов для сводных списков покупок.
+        """
+        amounts = {
+            ingredient['ingredient'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        existing = {
+            row.ingredient_id: row
+            for row in IngredientInRecipe.objects.filter(recipe=recipe)
+        }
+        deltas = {
+            ingredient_id: amount
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in existing
+        }
+        removed = []
+        changed = []
+        for ingredient_id, row in existing.items():
+            amount = amounts.get(ingredient_id, 0)
+            if amount == row.amount:
+                continue
+            deltas[ingredient_id] = amount - row.amount
+            if amount:
+                row.amount = amount
+                changed.append(row)
+            else:
+                removed.append(row.id)
+        if removed:
+            IngredientInRecipe.objects.filter(id__in=removed).delete()
+        if changed:
+            IngredientInRecipe.objects.bulk_update(changed, ('amount',))
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(
+                recipe=recipe,
+                ingredient=ingredient['ingredient'],
+                amount=ingredient['amount'],
             )
-            ingr_in_recipe, st = IngredientInRecipe.objects.update_or_create(
-                ingredient=ingr_obj, recipe=instance, amount=amount
+            for ingredient in ingredients
+            if ingredient['ingredient'].id not in existing
+        )
+        return deltas
+
+    @staticmethod
+    def update_tags(recipe, tags):
+        """Приводит теги рецепта к новому списку."""
+        tag_ids = {tag.id for tag in tags}
+        existing = set(
+            RecipeTag.objects.filter(recipe=recipe).values_list(
+                'tag_id', flat=True
             )
-            ingr_in_recipe.save()
-        instance.tags.clear()
-        instance.tags.set(tags)
-        return super().update(instance=instance, validated_data=validated_data)
+        )
+        if existing - tag_ids:
+            RecipeTag.objects.filter(
+                recipe=recipe, tag_id__in=existing - tag_ids
+            ).delete()
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=recipe, tag=tag)
+            for tag in tags
+            if tag.id not in existing
+        )
 
     def to_representation(self, instance):
         request = self.context['request']
+        prefetch_related_objects([instance], 'tags', 'ingredients__ingredient')
         return RecipeReadSerializer(
             instance, context={'request': request}
         ).data
@@ -264,46 +413,48 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
 class RecipeShortSerializer(serializers.ModelSerializer):
     """Сериализатор для рецептов с полями id, name, image, cooking_time."""
 
+    image_thumb = ImageVariantsField(source='image_variants')
+    image_srcset = ImageVariantsField(source='image_variants', srcset=True)
+
     class Meta:
         model = Recipe
         fields = (
             'id',
             'name',
             'image',
+            'image_thumb',
+            'image_srcset',
             'cooking_time',
         )
 
 
-class DownloadShoppingCartSerializer(serializers.Serializer):
-    """Сериализатор для скачивания списка покупок."""
+class ShoppingListItemSerializer(serializers.ModelSerializer):
+    """Сериализатор для сводного списка покупок."""
 
-    ingredient = serializers.CharField(
-        source='recipe__ingredients__ingredient__name'
-    )
-    amount = serializers.IntegerField(source='sum')
-    unit = serializers.CharField(
-        source='recipe__ingredients__ingredient__measurement_unit'
+    id = serializers.ReadOnlyField(source='ingredient.id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit'
     )
 
     class Meta:
+        model = ShoppingListItem
         fields = (
-            'ingredient',
-            'amount',
-            'unit',
-        )
-        read_only_fields = (
-            'ingredient',
+            'id',
+            'name',
+            'measurement_unit',
             'amount',
-            'unit',
         )
 
 
-class UserRecipeSerializer(serializers.ModelSerializer):
+class UserRecipeSerializer(SubscribedMixin, serializers.ModelSerializer):
     """Сериалайзер для отображения пользователей и их рецептов."""
 
     recipes = serializers.SerializerMethodField('paginated_recipe')
     is_subscribed = serializers.SerializerMethodField()
     recipes_count = serializers.IntegerField()
+    avatar_thumb = ImageVariantsField(source='avatar_variants')
+    avatar_srcset = ImageVariantsField(source='avatar_variants', srcset=True)
 
     class Meta:
         model = User
@@ -317,6 +468,8 @@ class UserRecipeSerializer(serializers.ModelSerializer):
             'recipes',
             'recipes_count',
             'avatar',
+            'avatar_thumb',
+            'avatar_srcset',
         )
         read_only_fields = (
             'email',
@@ -328,22 +481,15 @@ class UserRecipeSerializer(serializers.ModelSerializer):
             'recipes',
             'recipes_count',
             'avatar',
-        )
-
-    def get_is_subscribed(self, following):
-        return self.context['request'].user in User.objects.filter(
-            followers__following=following
+            'avatar_thumb',
+            'avatar_srcset',
         )
 
     def paginated_recipe(self, obj):
-        page_size = (
-            self.context['request'].query_params.get('recipes_limit')
-            or constants.NUMBER_OF_RECIPES
-        )
-        paginator = Paginator(obj.recipes.all(), page_size)
-        page = 1
-
-        users_recipe = paginator.page(page)
-        serializer = RecipeShortSerializer(users_recipe, many=True)
+        recipes = getattr(obj, 'limited_recipes', None)
+        if recipes is None:
+            recipes_limit = get_recipes_limit(self.context['request'])
+            recipes = obj.recipes.all()[:recipes_limit]
+        serializer = RecipeShortSerializer(recipes, many=True)
 
         return serializer.data
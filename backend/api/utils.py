@@ -0,0 +1,130 @@
+import base64
+import binascii
+import csv
+import io
+import json
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from PIL import Image
+from rest_framework import serializers
+
+from recipes.constants import (
+    BASE64_CHUNK_SIZE,
+    IMAGE_SIGNATURES,
+    SHOPPING_CART_FILE_HEADERS,
+)
+
+
+def stream_csv(rows):
+    """Построчная выдача списка покупок в формате CSV."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(SHOPPING_CART_FILE_HEADERS)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_txt(rows):
+    """Построчная выдача списка покупок простым текстом."""
+    for name, amount, unit in rows:
+        yield f'{name} ({unit}) — {amount}\n'
+
+
+def stream_json(rows):
+    """Выдача списка покупок JSON-массивом по одному объекту."""
+    separator = '['
+    for row in rows:
+        yield separator + json.dumps(
+            dict(zip(SHOPPING_CART_FILE_HEADERS, row)), ensure_ascii=False
+        )
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+SHOPPING_CART_FORMATS = {
+    'csv': (stream_csv, 'text/csv'),
+    'txt': (stream_txt, 'text/plain'),
+    'json': (stream_json, 'application/json'),
+}
+"""Форматы файла списка покупок: функция выдачи и тип содержимого."""
+
+
+def sniff_image_type(head):
+    """Определение типа изображения по первым байтам файла."""
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def decode_base64_image(data):
+    """Декодирование изображения из data URI с ограничением памяти.
+
+    Размер проверяется по длине строки до декодирования, строка
+    декодируется частями во временный файл, который уходит на диск
+    после FILE_UPLOAD_MAX_MEMORY_SIZE. Пробелы и переводы строк
+    в base64 пропускаются. Тип файла определяется по его содержимому,
+    размеры в пикселях сравниваются с IMAGE_UPLOAD_MAX_PIXELS
+    по заголовку до распаковки изображения.
+    """
+    start = data.find(',') + 1
+    if not start or not data[:start].endswith(';base64,'):
+        raise serializers.ValidationError(
+            'Изображение должно быть передано в формате base64.'
+        )
+    if (len(data) - start) // 4 * 3 > settings.IMAGE_UPLOAD_MAX_SIZE:
+        raise serializers.ValidationError(
+            'Размер изображения не должен превышать '
+            f'{settings.IMAGE_UPLOAD_MAX_SIZE} байт.'
+        )
+    file = tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    try:
+        rest = ''
+        for position in range(start, len(data), BASE64_CHUNK_SIZE):
+            chunk = rest + ''.join(
+                data[position:position + BASE64_CHUNK_SIZE].split()
+            )
+            end = len(chunk) // 4 * 4
+            file.write(base64.b64decode(chunk[:end], validate=True))
+            rest = chunk[end:]
+        file.write(base64.b64decode(rest, validate=True))
+        file.seek(0)
+        extension = sniff_image_type(file.read(16))
+        if extension is None:
+            raise serializers.ValidationError(
+                'Неподдерживаемый формат изображения.'
+            )
+        file.seek(0)
+        with Image.open(file) as image:
+            width, height = image.size
+            if width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+                raise serializers.ValidationError(
+                    'Изображение не должно содержать больше '
+                    f'{settings.IMAGE_UPLOAD_MAX_PIXELS} пикселей.'
+                )
+            image.verify()
+    except serializers.ValidationError:
+        file.close()
+        raise
+    except (
+        binascii.Error,
+        OSError,
+        SyntaxError,
+        Image.DecompressionBombError,
+    ):
+        file.close()
+        raise serializers.ValidationError(
+            'Загрузите корректное изображение.'
+        )
+    file.seek(0)
+    return File(file, name=f'temp.{extension}')
@@ -1,33 +1,60 @@
-import csv
-import io
-
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Sum
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404, redirect
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Prefetch, Value, Window
+from django.db.models.functions import RowNumber
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet as BaseUserViewSet
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
-from api.filters import IngredientFilter, RecipeFilter, RecipeTagFilter
-from api.mixins import MultiSerializerMixin
-from api.paginations import UserRecipePagination
+from api.filters import (
+    IngredientFilter,
+    RecipeFilter,
+    RecipeOrderingFilter,
+    RecipeTagFilter,
+)
+from api.mixins import (
+    AnonymousCacheMixin,
+    CatalogCacheMixin,
+    MultiSerializerMixin,
+)
+from api.paginations import (
+    FeedPagination,
+    RecipePagination,
+    UserRecipePagination,
+    get_recipes_limit,
+)
 from api.permissions import IsAuthorOrReadOnly, IsCurrentUser, ReadOnly
 from api.serializers import (
     AvatarSerializer,
-    DownloadShoppingCartSerializer,
     IngredientSerializer,
     RecipeReadSerializer,
     RecipeWriteSerializer,
     RecipeShortSerializer,
+    ShoppingListItemSerializer,
     TagSerializer,
     UserRecipeSerializer,
 )
-from recipes.constants import SHOPPING_CART_FILE_HEADERS
-from recipes.models import Favorites, Ingredient, Recipe, ShoppingCart, Tag
+from api.utils import SHOPPING_CART_FORMATS
+from recipes import ingredient_index, shopping_list
+from recipes.constants import (
+    INGREDIENTS_CATALOG,
+    RECIPES_GENERATION,
+    SHOPPING_CART_CHUNK_SIZE,
+    TAGS_CATALOG,
+)
+from recipes.models import (
+    Favorites,
+    Ingredient,
+    Recipe,
+    ShoppingCart,
+    ShoppingListItem,
+    Tag,
+)
 from users.models import Follow
 
 User = get_user_model()
@@ -56,6 +83,29 @@ class UserViewSet(BaseUserViewSet):
             return [IsAuthenticated()]
         return super().get_permissions()
 
+    def with_recipes(self, queryset):
+        """Добавляет к авторам их последние рецепты.
+
+        Первые `recipes_limit` рецептов каждого автора выбираются одним
+        запросом с оконной функцией ROW_NUMBER и сохраняются в атрибут
+        `limited_recipes`. Количество рецептов хранится в самой модели
+        пользователя.
+        """
+        recipes = (
+            Recipe.objects.annotate(
+                row_number=Window(
+                    RowNumber(),
+                    partition_by=F('author_id'),
+                    order_by=(F('pub_date').desc(), F('id').desc()),
+                )
+            )
+            .filter(row_number__lte=get_recipes_limit(self.request))
+            .order_by('-pub_date', '-id')
+        )
+        return queryset.prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        )
+
     @action(['put', 'delete'], detail=False, url_path='me/avatar')
     def avatar(self, request, *args, **kwargs):
         """Добавление и удаление автарки пользователя."""
@@ -74,12 +124,8 @@ class UserViewSet(BaseUserViewSet):
     @action(['get'], detail=False)
     def subscriptions(self, request, *args, **kwargs):
         """Получение пользователем всех подписок."""
-        followings = (
-            User.objects.prefetch_related('followings__following__recipes')
-            .filter(followings__user=request.user)
-            .annotate(
-                recipes_count=Count('followings__following__recipes'),
-            )
+        followings = self.with_recipes(
+            User.objects.filter(followings__user=request.user)
         )
         page = self.paginate_queryset(followings)
         if page is not None:
@@ -97,10 +143,7 @@ class UserViewSet(BaseUserViewSet):
         user = self.request.user
         if request.method == 'POST':
             following = get_object_or_404(
-                User.objects.prefetch_related('recipes').annotate(
-                    recipes_count=Count('recipes')
-                ),
-                id=kwargs.get('id'),
+                self.with_recipes(User.objects.all()), id=kwargs.get('id')
             )
             if user == following:
                 return Response(
@@ -131,61 +174,93 @@ class UserViewSet(BaseUserViewSet):
         )
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     """Получение списка тегов.
 
     Позволяет получить список всех тегов, имеющихся в базе
-    одним списком.
+    одним списком. Список кешируется до изменения тегов и отдается
+    с ETag, поддерживаются условные запросы.
     Доступно всем пользователям.
     """
 
+    catalog_name = TAGS_CATALOG
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     """Получение списка ингредиентов.
 
     Позволяет получить список всех инредиентов, имеющихся в базе
-    одним списком. Имеется возможность поиска по имени.
-    Поиск производится по частичному вхождению в начале названия ингредиента.
+    одним списком. Полный список кешируется до изменения ингредиентов
+    и отдается с ETag, поддерживаются условные запросы.
+    Имеется возможность поиска по имени.
+    Поиск производится по частичному вхождению в начале названия ингредиента
+    по индексу в памяти процесса, без обращения к базе данных. Количество
+    найденных ингредиентов ограничено настройкой INGREDIENT_SEARCH_LIMIT,
+    первым идет точное совпадение, затем самые короткие названия.
     Доступно всем пользователям.
     """
 
+    catalog_name = INGREDIENTS_CATALOG
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny,)
     pagination_class = None
     filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name is None:
+            return super().list(request, *args, **kwargs)
+        return Response(ingredient_index.search(name))
 
-class RecipeViewSet(MultiSerializerMixin, viewsets.ModelViewSet):
+
+class RecipeViewSet(
+    AnonymousCacheMixin, MultiSerializerMixin, viewsets.ModelViewSet
+):
     """Рецепты.
 
     Предоставляет возможность получить список рецептов
     или отдельно взятый рецепт, а также получить короткую
     ссылку на рецепт всем пользователям.
-    Доступна фильтрация по избранному, автору, списку покупок и тегам.
+    Доступна фильтрация по избранному, автору, списку покупок и тегам,
+    а также полнотекстовый поиск по названию и описанию (`search`),
+    результаты которого упорядочены по релевантности.
     Для зарегистрированных пользователей имеется возможность создавать,
     редактировать и удалять свои рецепты. Также зарегистрированные
     пользователи могут добавлять или удалять рецепты в избранное или
     в список покупок.
+    Список рецептов доступен постранично (`page`, `limit`) и по курсору
+    (`cursor`, `limit`) для быстрого перехода вглубь ленты.
+    Доступна сортировка параметром `ordering` по дате публикации
+    и популярности (`-favorites_count`), в режиме курсора рецепты всегда
+    упорядочены по дате публикации.
+    Ответы анонимным пользователям кешируются до изменения рецептов.
+    Зарегистрированным пользователям доступна лента рецептов авторов,
+    на которых они подписаны (`feed`), с пагинацией по курсору.
     """
 
+    cache_generation = RECIPES_GENERATION
     queryset = Recipe.objects.select_related('author').prefetch_related(
-        'tags', 'ingredients'
+        'tags', 'ingredients__ingredient'
     )
     permission_classes = (IsAuthorOrReadOnly,)
+    pagination_class = RecipePagination
     filter_backends = [
         DjangoFilterBackend,
+        RecipeOrderingFilter,
     ]
+    ordering_fields = ('pub_date', 'favorites_count')
     filterset_class = None
     serializer_class = RecipeWriteSerializer
     serializer_classes = {
         'shopping_cart': RecipeShortSerializer,
         'favorite': RecipeShortSerializer,
+        'shopping_cart_summary': ShoppingListItemSerializer,
+        'feed': RecipeReadSerializer,
         'list': RecipeReadSerializer,
         'retrieve': RecipeReadSerializer,
         'create': RecipeWriteSerializer,
@@ -197,16 +272,42 @@ class RecipeViewSet(MultiSerializerMixin, viewsets.ModelViewSet):
             self.filterset_class = RecipeFilter
         else:
             self.filterset_class = RecipeTagFilter
-        return super().get_queryset()
+        return self.annotate_user_flags(super().get_queryset())
+
+    def annotate_user_flags(self, queryset):
+        """Добавляет к рецептам флаги избранного и списка покупок.
+
+        Флаги вычисляются в основном запросе для текущего пользователя,
+        для анонимных пользователей всегда ложны.
+        """
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+            )
+        return queryset.annotate(
+            is_favorited=Exists(
+                Favorites.objects.filter(recipe=OuterRef('pk'), user=user)
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(recipe=OuterRef('pk'), user=user)
+            ),
+        )
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
-        return super().perform_create(serializer)
 
     def get_permissions(self):
         if self.action in ('list', 'get_link'):
             return [ReadOnly()]
-        if self.action in ('create', 'shopping_cart', 'favorite'):
+        if self.action in (
+            'create',
+            'shopping_cart',
+            'shopping_cart_summary',
+            'favorite',
+            'feed',
+        ):
             return [IsAuthenticated()]
         return [IsAuthorOrReadOnly()]
 
@@ -215,8 +316,13 @@ class RecipeViewSet(MultiSerializerMixin, viewsets.ModelViewSet):
         detail=True,
         url_path='shopping_cart',
     )
+    @transaction.atomic
     def shopping_cart(self, request, *args, **kwargs):
-        """Добавление рецепта в список покупок и удаления оттуда."""
+        """Добавление рецепта в список покупок и удаления оттуда.
+
+        Вместе со списком покупок изменяется сводный список
+        ингредиентов пользователя.
+        """
         user = request.user
         if request.method == 'POST':
             recipe = get_object_or_404(Recipe, id=kwargs.get('pk'))
@@ -228,6 +334,7 @@ class RecipeViewSet(MultiSerializerMixin, viewsets.ModelViewSet):
                     {'detail': 'Рецепт уже в списке покупок.'},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
+            shopping_list.add_recipe(user.id, recipe.id)
             serializer = self.get_serializer(
                 recipe, context={'request': request}
             )
@@ -237,12 +344,24 @@ class RecipeViewSet(MultiSerializerMixin, viewsets.ModelViewSet):
             recipe_id=kwargs.get('pk'), user=user
         ).delete()
         if deleted:
+            shopping_list.remove_recipe(user.id, kwargs.get('pk'))
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
             {'detail': 'Рецепта нет в списке покупок.'},
             status=status.HTTP_400_BAD_REQUEST,
         )
 
+    @action(['get'], detail=False, url_path='shopping_cart/summary')
+    def shopping_cart_summary(self, request, *args, **kwargs):
+        """Сводный список ингредиентов из списка покупок."""
+        items = (
+            ShoppingListItem.objects.filter(user=request.user)
+            .select_related('ingredient')
+            .order_by('ingredient__name')
+        )
+        serializer = self.get_serializer(items, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
     @action(
         ['post', 'delete'],
         detail=True,
@@ -276,6 +395,13 @@ class RecipeViewSet(MultiSerializerMixin, viewsets.ModelViewSet):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
+    @action(['get'], detail=False, pagination_class=FeedPagination)
+    def feed(self, request, *args, **kwargs):
+        """Лента рецептов авторов, на которых подписан пользователь."""
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @action(['get'], detail=True, url_path='get-link')
     def get_link(self, request, *args, **kwargs):
         """Получение короткой ссылки на рецепт."""
@@ -295,58 +421,53 @@ class DownloadView(viewsets.ViewSet):
 
     Позволяет зарегистрированным пользователям скачать список покупок.
     Список покупок скачивается одним файлов с суммированием ингредиентов
-    из разных рецептов. Файл в формате CSV.
+    из разных рецептов, суммы берутся из сводного списка покупок.
+    Формат файла задается параметром `format`: csv (по умолчанию), txt
+    или json. Файл формируется по мере чтения строк из базы данных
+    и отдается потоком.
     """
 
-    queryset = ShoppingCart.objects.all()
-    serializer_class = DownloadShoppingCartSerializer
+    queryset = ShoppingListItem.objects.all()
     permission_classes = [IsAuthenticated]
     pagination_class = None
 
     def get_queryset(self):
         return (
             self.queryset.filter(user=self.request.user)
-            .values(
-                'recipe__ingredients__ingredient__name',
-                'recipe__ingredients__ingredient__measurement_unit',
+            .values_list(
+                'ingredient__name',
+                'amount',
+                'ingredient__measurement_unit',
             )
-            .annotate(sum=Sum('recipe__ingredients__amount'))
+            .order_by('ingredient__name')
         )
 
+    def perform_content_negotiation(self, request, force=False):
+        """Параметр `format` задает формат файла, а не рендерер DRF."""
+        return super().perform_content_negotiation(request, force=True)
+
     @action(detail=False, methods=['get'], url_name='download_shopping_cart')
     def download(self, request):
-        """Cкачиваниt файла списка покупок."""
-        queryset = self.get_queryset()
-        serializer = self.serializer_class(queryset, many=True)
-
-        csv_buffer = io.StringIO()
-        csv_writer = csv.DictWriter(
-            csv_buffer,
-            fieldnames=SHOPPING_CART_FILE_HEADERS,
-            extrasaction='ignore',
+        """Cкачивание файла списка покупок."""
+        file_format = request.query_params.get('format', 'csv')
+        if file_format not in SHOPPING_CART_FORMATS:
+            return Response(
+                {
+                    'errors': 'Допустимые форматы: '
+                    f'{", ".join(SHOPPING_CART_FORMATS)}.'
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        stream, content_type = SHOPPING_CART_FORMATS[file_format]
+        rows = self.get_queryset().iterator(
+            chunk_size=SHOPPING_CART_CHUNK_SIZE
         )
-        csv_writer.writeheader()
-
-        for ingredient in serializer.data:
-            csv_writer.writerow(ingredient)
-
-        return HttpResponse(
-            csv_buffer.getvalue(),
+        return StreamingHttpResponse(
+            stream(rows),
             headers={
-                'Content-Disposition': 'attachment; filename="Shopping.csv"',
-                'Accept': 'text/csv',
+                'Content-Disposition': (
+                    f'attachment; filename="Shopping.{file_format}"'
+                ),
             },
-            content_type='text/csv',
+            content_type=f'{content_type}; charset=utf-8',
         )
-
-
-@api_view(['GET'])
-@permission_classes([AllowAny])
-def short_link_view(request, surl):
-    """Функция перенаправления пользователей.
-
-    При переходе по короткой ссылке рецепта
-    пользователи перенаправляются на страцицу рецепта.
-    """
-    recipe = get_object_or_404(Recipe, short_link=surl)
-    return redirect('recipes-detail', pk=recipe.id)
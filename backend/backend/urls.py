@@ -3,7 +3,7 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
-from api.views import short_link_view
+from recipes.views import short_link_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -2,6 +2,8 @@ from django.contrib import admin
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
 
+from recipes import shopping_list
+from recipes.admin_utils import AutocompleteFilter, LargeTableAdminMixin
 from recipes.models import (
     Favorites,
     Ingredient,
@@ -16,7 +18,7 @@ admin.site.empty_value_display = '-пусто-'
 
 
 @admin.register(Favorites)
-class FavoritesAdmin(admin.ModelAdmin):
+class FavoritesAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """Админка для избранного."""
 
     list_display = (
@@ -29,17 +31,15 @@ class FavoritesAdmin(admin.ModelAdmin):
         'user',
     )
     search_fields = (
-        'user__username',
-        'recipe__name',
+        '^user__username',
+        '^recipe__name',
     )
     list_filter = (
-        'recipe',
-        'user',
+        ('recipe', AutocompleteFilter),
+        ('user', AutocompleteFilter),
     )
-
-    def get_queryset(self, request: HttpRequest) -> QuerySet:
-        qs = super().get_queryset(request)
-        return qs.select_related('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
 
 
 @admin.register(Ingredient)
@@ -50,13 +50,18 @@ class IngredientAdmin(admin.ModelAdmin):
         'name',
         'measurement_unit',
     )
-    search_fields = ('name',)
+    search_fields = ('^name',)
     list_display_links = ('name',)
 
 
 class IngredientInline(admin.StackedInline):
     model = IngredientInRecipe
     extra = 0
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request: HttpRequest) -> QuerySet:
+        qs = super().get_queryset(request)
+        return qs.select_related('recipe', 'ingredient')
 
 
 @admin.register(Tag)
@@ -78,11 +83,19 @@ class TagAdmin(admin.ModelAdmin):
 class TagInline(admin.StackedInline):
     model = RecipeTag
     extra = 0
+    autocomplete_fields = ('tag',)
+
+    def get_queryset(self, request: HttpRequest) -> QuerySet:
+        qs = super().get_queryset(request)
+        return qs.select_related('recipe', 'tag')
 
 
 @admin.register(IngredientInRecipe)
-class IngredientInRecipeAdmin(admin.ModelAdmin):
-    """Админка для ингредиентов в рецептах."""
+class IngredientInRecipeAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    """Админка для ингредиентов в рецептах.
+
+    Изменения переносятся в сводные списки покупок.
+    """
 
     list_display = (
         'pk',
@@ -95,47 +108,65 @@ class IngredientInRecipeAdmin(admin.ModelAdmin):
         'recipe',
     )
     search_fields = (
-        'recipe__name',
-        'ingredient__name',
+        '^recipe__name',
+        '^ingredient__name',
     )
     list_filter = (
-        'recipe',
+        ('recipe', AutocompleteFilter),
     )
+    list_select_related = ('ingredient', 'recipe')
+    autocomplete_fields = ('ingredient', 'recipe')
 
-    def get_queryset(self, request: HttpRequest) -> QuerySet:
-        qs = super().get_queryset(request)
-        return qs.select_related('ingredient', 'recipe')
+    def get_readonly_fields(self, request, obj=None):
+        if obj is not None:
+            return ('recipe',)
+        return ()
+
+    def save_model(self, request, obj, form, change):
+        with shopping_list.recipes_changing([obj.recipe_id]):
+            super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        with shopping_list.recipes_changing([obj.recipe_id]):
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        with shopping_list.recipes_changing(recipe_ids):
+            super().delete_queryset(request, queryset)
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """Админка для рецептов."""
 
     inlines = [IngredientInline, TagInline]
-    list_display = ('name', 'author', 'favorited_count')
-    search_fields = (
+    list_display = (
         'name',
-        'author__username',
+        'author',
+        'favorites_count',
+        'shopping_cart_count',
+    )
+    search_fields = (
+        '^name',
+        '^author__username',
     )
     list_filter = (
-        'author',
+        ('author', AutocompleteFilter),
         'tags',
     )
     list_display_links = ('name',)
+    list_select_related = ('author',)
+    autocomplete_fields = ('author',)
+    readonly_fields = ('favorites_count', 'shopping_cart_count')
 
-    def get_queryset(self, request: HttpRequest) -> QuerySet:
-        qs = super().get_queryset(request)
-        return qs.select_related('author').prefetch_related(
-            'tags', 'ingredients__ingredient'
-        )
-
-    @admin.display(description='В избранном')
-    def favorited_count(self, recipe: Recipe):
-        return Favorites.objects.filter(recipe=recipe).count()
+    def save_related(self, request, form, formsets, change):
+        with shopping_list.recipes_changing([form.instance.pk]):
+            super().save_related(request, form, formsets, change)
 
 
 @admin.register(RecipeTag)
-class RecipeTagAdmin(admin.ModelAdmin):
+class RecipeTagAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """Админка для тегов рецептов."""
 
     list_display = (
@@ -147,11 +178,17 @@ class RecipeTagAdmin(admin.ModelAdmin):
         'recipe',
         'tag',
     )
+    list_select_related = ('recipe', 'tag')
+    autocomplete_fields = ('recipe', 'tag')
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
-    """Админка для списка покупок."""
+class ShoppingCartAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    """Админка для списка покупок.
+
+    Добавление и удаление рецептов переносится в сводные списки
+    покупок, изменять существующие записи нельзя.
+    """
 
     list_display = (
         'pk',
@@ -163,14 +200,32 @@ class ShoppingCartAdmin(admin.ModelAdmin):
         'user',
     )
     search_fields = (
-        'user__username',
-        'recipe__name',
+        '^user__username',
+        '^recipe__name',
     )
     list_filter = (
-        'user',
-        'recipe',
-    )
-
-    def get_queryset(self, request: HttpRequest) -> QuerySet:
-        qs = super().get_queryset(request)
-        return qs.select_related('user', 'recipe')
+        ('user', AutocompleteFilter),
+        ('recipe', AutocompleteFilter),
+    )
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj is not None:
+            return ('user', 'recipe')
+        return ()
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change:
+            shopping_list.add_recipe(obj.user_id, obj.recipe_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        shopping_list.remove_recipe(obj.user_id, obj.recipe_id)
+
+    def delete_queryset(self, request, queryset):
+        rows = list(queryset.values_list('user_id', 'recipe_id'))
+        super().delete_queryset(request, queryset)
+        for user_id, recipe_id in rows:
+            shopping_list.remove_recipe(user_id, recipe_id)
@@ -0,0 +1,122 @@
+from typing import Optional
+
+from django import forms
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+
+from recipes import constants
+
+
+def get_estimated_count(queryset: QuerySet) -> Optional[int]:
+    """Оценка количества строк таблицы по статистике планировщика.
+
+    Доступна только на PostgreSQL, для остальных СУБД возвращает None.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор без точного COUNT(*) для больших таблиц.
+
+    Для нефильтрованного списка берёт оценку из статистики планировщика,
+    если она превышает ADMIN_ESTIMATED_COUNT_THRESHOLD, иначе считает
+    строки как обычно.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = get_estimated_count(queryset)
+            if (
+                estimate is not None
+                and estimate > constants.ADMIN_ESTIMATED_COUNT_THRESHOLD
+            ):
+                return estimate
+        return super().count
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """Фильтр по внешнему ключу с автодополнением.
+
+    Вместо списка всех объектов связанной модели выводит поле выбора,
+    которое подгружает варианты через autocomplete-view админки.
+    Связанная модель должна быть зарегистрирована с search_fields.
+    """
+
+    template = 'admin/autocomplete_filter.html'
+
+    def __init__(
+        self, field, request, params, model, model_admin, field_path
+    ):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        self.lookup_val = params.get(self.lookup_kwarg)
+        super().__init__(
+            field, request, params, model, model_admin, field_path
+        )
+        self.admin_site = model_admin.admin_site
+
+    def has_output(self) -> bool:
+        return True
+
+    def expected_parameters(self) -> list[str]:
+        return [self.lookup_kwarg]
+
+    def get_widget(self) -> str:
+        form_field = forms.ModelChoiceField(
+            queryset=self.field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(self.field, self.admin_site),
+            required=False,
+        )
+        return form_field.widget.render(
+            self.lookup_kwarg,
+            self.lookup_val,
+            attrs={
+                'id': f'id_filter_{self.field_path}',
+                'onchange': 'this.form.submit()',
+            },
+        )
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.lookup_val is not None,
+            'query_string': changelist.get_query_string(
+                remove=[self.lookup_kwarg]
+            ),
+            'params': [
+                (name, value)
+                for name, value in changelist.params.items()
+                if name != self.lookup_kwarg
+            ],
+            'widget': self.get_widget(),
+        }
+
+
+class LargeTableAdminMixin:
+    """Настройки списка объектов для больших таблиц.
+
+    Отключает точный подсчёт строк и подключает статику, нужную
+    для AutocompleteFilter.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def media(self) -> forms.Media:
+        return super().media + AutocompleteSelect(None, self.admin_site).media
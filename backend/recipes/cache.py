@@ -0,0 +1,50 @@
+import threading
+import uuid
+
+from django.core.cache import cache
+
+VERSION_KEY = 'version:{}'
+
+
+def _new_version():
+    return uuid.uuid4().hex
+
+
+def get_version(name):
+    """Текущая версия набора данных `name`.
+
+    Версия хранится в общем кеше, поэтому одинакова для всех процессов,
+    использующих один бэкенд кеширования.
+    """
+    return cache.get_or_set(VERSION_KEY.format(name), _new_version, None)
+
+
+def bump_version(name):
+    """Смена версии набора данных `name` после его изменения."""
+    cache.set(VERSION_KEY.format(name), _new_version(), None)
+
+
+class VersionedSnapshot:
+    """Данные в памяти процесса, привязанные к версии набора данных.
+
+    Данные строятся функцией `load` и перестраиваются при первом
+    обращении после смены версии набора `name` в общем кеше.
+    """
+
+    def __init__(self, name, load):
+        self.name = name
+        self.load = load
+        self._snapshot = (None, None)
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Данные текущей версии набора."""
+        version = get_version(self.name)
+        loaded_version, data = self._snapshot
+        if loaded_version != version:
+            with self._lock:
+                loaded_version, data = self._snapshot
+                if loaded_version != version:
+                    data = self.load()
+                    self._snapshot = (version, data)
+        return data
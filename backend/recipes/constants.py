@@ -40,12 +40,34 @@ MAX_AMOUNT = 2000
 LINK_MAX_LENGTH = 150
 """Максимальная длина поля короткой ссылки рецепта."""
 
-LENGTH_SHORT_LINK = 8
-"""Длина строки короткой ссылки рецепта."""
+LENGTH_SHORT_LINK = 7
+"""Длина строки короткой ссылки рецепта.
+
+Ранее ссылки генерировались случайно и имели длину 8 символов,
+поэтому новые ссылки с ними не пересекаются.
+"""
+
+SHORT_LINK_ALPHABET = (
+    '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+)
+"""Алфавит короткой ссылки рецепта."""
+
+SHORT_LINK_MULTIPLIER = 2176477521739
+"""Множитель для перемешивания id рецепта в короткой ссылке.
+
+Должен быть взаимно прост с основанием алфавита. Изменение значения
+сделает недействительными все выданные ссылки.
+"""
+
+SHORT_LINK_OFFSET = 918273645
+"""Смещение для перемешивания id рецепта в короткой ссылке."""
 
 SHOPPING_CART_FILE_HEADERS = ["ingredient", "amount", "unit"]
 """Список заголовков таблицы списка покупок."""
 
+SHOPPING_CART_CHUNK_SIZE = 500
+"""Количество строк списка покупок, читаемых из базы за один раз."""
+
 NUMBER_OF_RECIPES = 10
 """Количество рецептов пользователя в выдаче по умолчанию."""
 
@@ -54,3 +76,74 @@ PAGE_SIZE = 6
 
 MAX_PAGE_SIZE = 100
 """Максимальный размер страницы при пагинации по умолчанию."""
+
+INGREDIENTS_CATALOG = 'ingredients'
+"""Имя версии каталога ингредиентов в кеше."""
+
+TAGS_CATALOG = 'tags'
+"""Имя версии каталога тегов в кеше."""
+
+SHORT_LINK_CACHE_MAX_AGE = 60 * 60
+"""Время кеширования перенаправления по короткой ссылке в секундах."""
+
+RECIPES_GENERATION = 'recipes'
+"""Имя версии данных рецептов для кеша ответов."""
+
+RESPONSE_CACHE_TIMEOUT = 10 * 60
+"""Время хранения ответа для анонимных пользователей в секундах."""
+
+CATALOG_CACHE_TIMEOUT = 24 * 60 * 60
+"""Время хранения сериализованного справочника в секундах."""
+
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+"""Число строк, начиная с которого админка использует оценку количества."""
+
+IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
+"""Ширина уменьшенных копий изображений в пикселях."""
+
+IMAGE_VARIANT_FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+"""Расширения и форматы Pillow уменьшенных копий изображений."""
+
+IMAGE_VARIANT_QUALITY = 80
+"""Качество сжатия уменьшенных копий изображений."""
+
+IMAGE_THUMB_FORMAT = 'jpg'
+"""Формат миниатюры, которую понимают все клиенты."""
+
+IMAGE_VARIANT_HASH_LENGTH = 12
+"""Длина хеша содержимого в имени уменьшенной копии."""
+
+BASE64_CHUNK_SIZE = 64 * 1024
+"""Размер части base64-строки, декодируемой за один шаг (кратен 4)."""
+
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+"""Сигнатуры начала файла и расширения допустимых изображений."""
+
+IMPORT_BATCH_SIZE = 1000
+"""Количество строк, записываемых в БД одним запросом при импорте."""
+
+IMPORT_READ_SIZE = 64 * 1024
+"""Размер блока, читаемого из файла при потоковом разборе JSON."""
+
+DUMP_CHUNK_SIZE = 2000
+"""Количество строк, читаемых из БД за раз при выгрузке рецептов."""
+
+SEARCH_CONFIG = 'russian'
+"""Конфигурация полнотекстового поиска PostgreSQL."""
+
+SEARCH_QUERY_MAX_LENGTH = 200
+"""Максимальная длина поискового запроса."""
+
+FEED_PUSH_MAX_FOLLOWERS = 1000
+"""Число подписчиков, до которого рецепты автора рассылаются в ленты."""
+
+FEED_BATCH_SIZE = 1000
+"""Количество записей ленты, создаваемых одним запросом."""
+
+SEED_BATCH_SIZE = 10000
+"""Количество строк, записываемых одним запросом при генерации данных."""
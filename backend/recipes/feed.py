@@ -0,0 +1,143 @@
+"""Ленты подписок.
+
+Рецепты авторов, у которых не больше FEED_PUSH_MAX_FOLLOWERS
+подписчиков, записываются в ленты подписчиков (FeedItem) при публикации
+и при подписке. Рецепты более популярных авторов в ленты не пишутся,
+а выбираются из таблицы рецептов при чтении и объединяются с записями
+ленты. Страницы ленты выбираются по ключу (pub_date, id) без OFFSET.
+"""
+from django.db.models import Q
+
+from recipes.constants import FEED_BATCH_SIZE, FEED_PUSH_MAX_FOLLOWERS
+from recipes.models import FeedItem, Recipe, User
+from users.models import Follow
+
+
+def create_items(items):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= FEED_BATCH_SIZE:
+            FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def is_pushed(author_id):
+    """Записываются ли рецепты автора в ленты подписчиков."""
+    return User.objects.filter(
+        pk=author_id, followers_count__lte=FEED_PUSH_MAX_FOLLOWERS
+    ).exists()
+
+
+def push_recipe(recipe):
+    """Запись нового рецепта в ленты подписчиков автора."""
+    if not is_pushed(recipe.author_id):
+        return
+    followers = (
+        Follow.objects.filter(following_id=recipe.author_id)
+        .values_list('user_id', flat=True)
+        .iterator(chunk_size=FEED_BATCH_SIZE)
+    )
+    create_items(
+        FeedItem(
+            user_id=user_id,
+            recipe_id=recipe.pk,
+            author_id=recipe.author_id,
+            pub_date=recipe.pub_date,
+        )
+        for user_id in followers
+    )
+
+
+def add_author(user_id, author_id):
+    """Запись рецептов автора в ленту нового подписчика."""
+    if is_pushed(author_id):
+        create_items(get_author_items(user_id, author_id))
+
+
+def get_author_items(user_id, author_id):
+    recipes = (
+        Recipe.objects.filter(author_id=author_id)
+        .values_list('id', 'pub_date')
+        .iterator(chunk_size=FEED_BATCH_SIZE)
+    )
+    for recipe_id, pub_date in recipes:
+        yield FeedItem(
+            user_id=user_id,
+            recipe_id=recipe_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+
+
+def rebuild_feeds():
+    """Пересоздание всех лент по подпискам, возвращает число записей."""
+    FeedItem.objects.all().delete()
+    follows = (
+        Follow.objects.filter(
+            following__followers_count__lte=FEED_PUSH_MAX_FOLLOWERS
+        )
+        .values_list('user_id', 'following_id')
+        .iterator(chunk_size=FEED_BATCH_SIZE)
+    )
+    create_items(
+        item
+        for user_id, author_id in follows
+        for item in get_author_items(user_id, author_id)
+    )
+    return FeedItem.objects.count()
+
+
+def remove_author(user_id, author_id):
+    """Удаление рецептов автора из ленты бывшего подписчика."""
+    FeedItem.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def get_keyset_rows(queryset, pk_field, boundary, reverse, limit):
+    """Пары (pub_date, id) страницы, следующей за границей boundary."""
+    if boundary is not None:
+        pub_date, pk = boundary
+        lookup = 'gt' if reverse else 'lt'
+        queryset = queryset.filter(
+            Q(**{f'pub_date__{lookup}': pub_date})
+            | Q(pub_date=pub_date, **{f'{pk_field}__{lookup}': pk})
+        )
+    if reverse:
+        queryset = queryset.order_by('pub_date', pk_field)
+    else:
+        queryset = queryset.order_by('-pub_date', f'-{pk_field}')
+    return list(queryset.values_list('pub_date', pk_field)[:limit])
+
+
+def get_page(user_id, boundary, reverse, limit):
+    """id рецептов страницы ленты в порядке выдачи.
+
+    Объединяет записи ленты пользователя и рецепты популярных авторов,
+    из каждого источника читается не больше limit строк.
+    """
+    pulled_authors = list(
+        Follow.objects.filter(
+            user_id=user_id,
+            following__followers_count__gt=FEED_PUSH_MAX_FOLLOWERS,
+        ).values_list('following_id', flat=True)
+    )
+    rows = get_keyset_rows(
+        FeedItem.objects.filter(user_id=user_id).exclude(
+            author_id__in=pulled_authors
+        ),
+        'recipe_id',
+        boundary,
+        reverse,
+        limit,
+    )
+    if pulled_authors:
+        rows += get_keyset_rows(
+            Recipe.objects.filter(author_id__in=pulled_authors),
+            'id',
+            boundary,
+            reverse,
+            limit,
+        )
+    rows.sort(reverse=not reverse)
+    return [pk for _, pk in rows[:limit]]
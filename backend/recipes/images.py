@@ -0,0 +1,186 @@
+import hashlib
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models.fields.files import FieldFile
+from PIL import Image, ImageOps
+
+from recipes import constants
+
+logger = logging.getLogger(__name__)
+
+variants_executor = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix='image-variants'
+)
+"""Поток, в котором создаются копии изображений после сохранения."""
+
+
+def get_variant_widths(width: int) -> list[int]:
+    """Ширины копий для изображения шириной width.
+
+    Изображение не увеличивается: копии шире оригинала заменяются
+    одной копией в исходную ширину.
+    """
+    widths = constants.IMAGE_VARIANT_WIDTHS
+    return sorted({min(variant, width) for variant in widths})
+
+
+def encode_variant(image: Image.Image, image_format: str) -> bytes:
+    """Кодирование копии в формат image_format.
+
+    Для JPEG прозрачные области заливаются белым цветом.
+    """
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        background = Image.new('RGB', image.size, 'white')
+        if image.mode in ('RGBA', 'LA', 'PA'):
+            background.paste(image, mask=image.getchannel('A'))
+        else:
+            background.paste(image.convert('RGB'))
+        image = background
+    buffer = io.BytesIO()
+    image.save(
+        buffer,
+        image_format,
+        quality=constants.IMAGE_VARIANT_QUALITY,
+        optimize=True,
+    )
+    return buffer.getvalue()
+
+
+def make_variants(file: FieldFile) -> dict:
+    """Создание уменьшенных копий сохранённого изображения.
+
+    Копии сохраняются рядом с оригиналом под именами с хешем содержимого,
+    поэтому их можно кешировать бессрочно. Возвращает словарь
+    {расширение: {ширина: имя файла}}.
+    """
+    file.open('rb')
+    try:
+        with Image.open(file) as original:
+            image = ImageOps.exif_transpose(original)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert(
+                    'RGBA' if 'transparency' in image.info else 'RGB'
+                )
+    finally:
+        file.close()
+    directory, filename = os.path.split(file.name)
+    stem = os.path.splitext(filename)[0]
+    variants = {extension: {} for extension in constants.IMAGE_VARIANT_FORMATS}
+    for width in get_variant_widths(image.width):
+        height = max(round(image.height * width / image.width), 1)
+        resized = image.resize(
+            (width, height), Image.Resampling.LANCZOS, reducing_gap=3.0
+        )
+        for extension, image_format in (
+            constants.IMAGE_VARIANT_FORMATS.items()
+        ):
+            content = encode_variant(resized, image_format)
+            digest = hashlib.sha256(content).hexdigest()[
+                :constants.IMAGE_VARIANT_HASH_LENGTH
+            ]
+            name = file.storage.save(
+                os.path.join(
+                    directory, f'{stem}_{width}w_{digest}.{extension}'
+                ),
+                ContentFile(content),
+            )
+            variants[extension][str(width)] = name
+    return variants
+
+
+def delete_variants(file: FieldFile, variants: dict):
+    """Удаление файлов копий изображения из хранилища."""
+    for names in variants.values():
+        for name in names.values():
+            file.storage.delete(name)
+
+
+def update_variants(instance, field_name: str, variants_name: str) -> bool:
+    """Создание копий изображения и запись их в БД.
+
+    Копии записываются, только если изображение в БД не изменилось,
+    иначе созданные файлы удаляются. Прежние копии удаляются после
+    записи новых.
+    """
+    file = getattr(instance, field_name)
+    old_variants = getattr(instance, variants_name) or {}
+    variants = make_variants(file)
+    updated = type(instance).objects.filter(
+        pk=instance.pk, **{field_name: file.name}
+    ).update(**{variants_name: variants})
+    delete_variants(file, old_variants if updated else variants)
+    return bool(updated)
+
+
+def generate_variants(model, pk, field_name: str, variants_name: str, name):
+    """Создание копий изображения `name` объекта модели в фоновом потоке.
+
+    Ошибки записываются в журнал, копии без них создаст команда
+    generateimagevariants.
+    """
+    try:
+        instance = (
+            model.objects.filter(pk=pk, **{field_name: name})
+            .only('pk', field_name, variants_name)
+            .first()
+        )
+        if instance is not None:
+            update_variants(instance, field_name, variants_name)
+    except Exception:
+        logger.exception('Не удалось создать копии изображения %s', name)
+    finally:
+        connection.close()
+
+
+def schedule_variants(instance, field_name: str, variants_name: str):
+    """Создание копий изображения после фиксации транзакции.
+
+    Изменение размеров и кодирование выполняются в отдельном потоке,
+    поэтому не задерживают запрос, до их окончания API возвращает
+    пустые ссылки на копии.
+    """
+    transaction.on_commit(
+        partial(
+            variants_executor.submit,
+            generate_variants,
+            type(instance),
+            instance.pk,
+            field_name,
+            variants_name,
+            getattr(instance, field_name).name,
+        )
+    )
+
+
+def wait_for_variants():
+    """Ожидание окончания создания уже запланированных копий."""
+    variants_executor.submit(lambda: None).result()
+
+
+def refresh_variants(
+    instance, field_name: str, variants_name: str, save_kwargs: dict
+) -> tuple[dict, bool]:
+    """Сброс копий изображения перед сохранением модели.
+
+    Возвращает копии, которые стали не нужны и должны быть удалены
+    после сохранения, и признак загрузки нового изображения, для
+    которого нужно создать копии.
+    """
+    update_fields = save_kwargs.get('update_fields')
+    if update_fields is not None:
+        if field_name not in update_fields:
+            return {}, False
+        save_kwargs['update_fields'] = {*update_fields, variants_name}
+    file = getattr(instance, field_name)
+    old_variants = getattr(instance, variants_name) or {}
+    changed = bool(file) and not file._committed
+    if changed or (not file and old_variants):
+        setattr(instance, variants_name, {})
+        return old_variants, changed
+    return {}, False
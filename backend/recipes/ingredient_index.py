@@ -0,0 +1,74 @@
+from django.conf import settings
+
+from recipes.cache import VersionedSnapshot
+from recipes.constants import INGREDIENTS_CATALOG
+from recipes.models import Ingredient
+
+
+class IngredientTrie:
+    """Префиксное дерево названий ингредиентов.
+
+    Названия приводятся к единому регистру (casefold). В каждом узле
+    хранится список ингредиентов, названия которых начинаются с префикса
+    этого узла, отсортированный по длине названия, а затем по алфавиту.
+    Поэтому точное совпадение всегда оказывается первым, за ним идут
+    самые короткие названия.
+    """
+
+    __slots__ = ('children', 'items')
+
+    def __init__(self):
+        self.children = {}
+        self.items = []
+
+    @classmethod
+    def build(cls, ingredients):
+        """Строит дерево из словарей с полями ингредиента."""
+        root = cls()
+        keyed = sorted(
+            (
+                (ingredient['name'].casefold(), ingredient)
+                for ingredient in ingredients
+            ),
+            key=lambda pair: (len(pair[0]), pair[0]),
+        )
+        for key, ingredient in keyed:
+            node = root
+            node.items.append(ingredient)
+            for char in key:
+                node = node.children.setdefault(char, cls())
+                node.items.append(ingredient)
+        return root
+
+    def search(self, prefix, limit):
+        """Возвращает не более `limit` ингредиентов с префиксом `prefix`."""
+        node = self
+        for char in prefix.casefold():
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.items[:limit]
+
+
+_index = VersionedSnapshot(
+    INGREDIENTS_CATALOG,
+    lambda: IngredientTrie.build(
+        Ingredient.objects.values('id', 'name', 'measurement_unit')
+    ),
+)
+
+
+def get_index():
+    """Возвращает индекс ингредиентов.
+
+    Индекс перестраивается, если версия каталога ингредиентов в кеше
+    изменилась с момента его построения.
+    """
+    return _index.get()
+
+
+def search(prefix, limit=None):
+    """Поиск ингредиентов по началу названия без обращения к базе."""
+    if limit is None:
+        limit = settings.INGREDIENT_SEARCH_LIMIT
+    return get_index().search(prefix, limit)
@@ -0,0 +1,120 @@
+"""Массовая запись строк в БД для команд импорта и генерации данных.
+
+На PostgreSQL строки передаются через COPY, на остальных СУБД —
+пакетами `executemany`. Строки пишутся напрямую, без `save()`
+и сигналов моделей, поэтому значения полей с `auto_now_add`
+и производные данные задаются вызывающим кодом.
+"""
+import csv
+import io
+import json
+from itertools import islice
+
+from django.db import connection
+
+COPY_NULL = r'\N'
+
+
+class CsvStream(io.TextIOBase):
+    """Файлоподобный объект, отдающий строки CSV для COPY."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or self.buffer.tell() < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.writer.writerow(row)
+        data = self.buffer.getvalue()
+        if size >= 0:
+            data, rest = data[:size], data[size:]
+        else:
+            rest = ''
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.buffer.write(rest)
+        return data
+
+
+def copy_value(value):
+    """Значение поля в виде, пригодном для COPY в формате CSV."""
+    if value is None:
+        return COPY_NULL
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def reserve_ids(model, count):
+    """Первый из `count` подряд идущих свободных id модели.
+
+    На PostgreSQL id резервируются сдвигом последовательности,
+    на остальных СУБД берутся следующие за наибольшим id, а счетчик
+    автоинкремента догоняет их при вставке.
+    """
+    table = model._meta.db_table
+    column = model._meta.pk.column
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql' and count > 0:
+            cursor.execute(
+                'SELECT setval(pg_get_serial_sequence(%s, %s), '
+                'nextval(pg_get_serial_sequence(%s, %s)) + %s - 1)',
+                [table, column, table, column, count],
+            )
+            return cursor.fetchone()[0] - count + 1
+        quote = connection.ops.quote_name
+        cursor.execute(f'SELECT MAX({quote(column)}) FROM {quote(table)}')
+        return (cursor.fetchone()[0] or 0) + 1
+
+
+def insert_rows(model, fields, rows, batch_size):
+    """Запись кортежей значений полей `fields` в таблицу модели.
+
+    Возвращает количество записанных строк.
+    """
+    opts = model._meta
+    model_fields = [opts.get_field(name) for name in fields]
+    quote = connection.ops.quote_name
+    table = quote(opts.db_table)
+    columns = ', '.join(quote(field.column) for field in model_fields)
+    count = 0
+
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.copy_expert(
+                f'COPY {table} ({columns}) FROM STDIN '
+                f"WITH (FORMAT csv, NULL '{COPY_NULL}')",
+                CsvStream(
+                    [copy_value(value) for value in row]
+                    for row in counted(rows)
+                ),
+            )
+            return count
+        placeholders = ', '.join(['%s'] * len(model_fields))
+        sql = f'INSERT INTO {table} ({columns}) VALUES ({placeholders})'
+        rows = counted(rows)
+        while batch := list(islice(rows, batch_size)):
+            cursor.executemany(
+                sql,
+                [
+                    [
+                        field.get_db_prep_save(value, connection)
+                        for field, value in zip(model_fields, row)
+                    ]
+                    for row in batch
+                ],
+            )
+    return count
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from recipes.models import Recipe
+from recipes.utils import decode_short_link, encode_short_link
+
+
+class Command(BaseCommand):
+    """Заполнение коротких ссылок рецептов."""
+
+    help = (
+        'Заполняет пустые короткие ссылки рецептов ссылками на основе id, '
+        'с ключом --rewrite также заменяет старые случайные ссылки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rewrite',
+            action='store_true',
+            help=(
+                'Заменить старые случайные ссылки. Выданные ранее ссылки '
+                'перестанут работать.'
+            ),
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество рецептов, обновляемых одним запросом.',
+        )
+
+    def handle(self, *args, **kwargs):
+        queryset = Recipe.objects.only('id', 'short_link').order_by('id')
+        if not kwargs['rewrite']:
+            queryset = queryset.filter(
+                Q(short_link__isnull=True) | Q(short_link='')
+            )
+        batch = []
+        updated = 0
+        for recipe in queryset.iterator(chunk_size=kwargs['batch_size']):
+            if decode_short_link(recipe.short_link or '') == recipe.id:
+                continue
+            recipe.short_link = encode_short_link(recipe.id)
+            batch.append(recipe)
+            if len(batch) >= kwargs['batch_size']:
+                Recipe.objects.bulk_update(batch, ('short_link',))
+                updated += len(batch)
+                batch = []
+        if batch:
+            Recipe.objects.bulk_update(batch, ('short_link',))
+            updated += len(batch)
+        self.stdout.write(
+            self.style.SUCCESS(f'Обновлено коротких ссылок: {updated}.')
+        )
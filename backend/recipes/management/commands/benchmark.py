@@ -0,0 +1,437 @@
+import base64
+import io
+import json
+import statistics
+import tempfile
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.images import wait_for_variants
+from recipes.management.seeding import Seeder, add_seed_arguments
+from recipes.models import (
+    Favorites,
+    Ingredient,
+    Recipe,
+    ShoppingCart,
+    Tag,
+)
+from users.models import Follow, User
+
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    }
+}
+
+
+class QueryCounter:
+    """Подсчет SQL-запросов и полученных строк.
+
+    Используется как обертка `connection.execute_wrapper`. Количество
+    строк берется из `cursor.rowcount`; если драйвер его не сообщает
+    (SQLite для SELECT), количество строк считается неизвестным.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        self.queries += 1
+        rowcount = context['cursor'].rowcount
+        if rowcount is None or rowcount < 0:
+            self.rows = None
+        elif self.rows is not None:
+            self.rows += rowcount
+        return result
+
+
+def percentiles(samples):
+    """p50, p95 и p99 выборки в миллисекундах."""
+    if len(samples) == 1:
+        return samples * 3
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return cuts[49], cuts[94], cuts[98]
+
+
+class Command(BaseCommand):
+    """Нагрузочный прогон API на синтетических данных."""
+
+    help = (
+        'Создает тестовую базу данных, заполняет ее синтетическими данными, '
+        'выполняет запросы ко всем эндпоинтам API через тестовый клиент '
+        'и выводит задержку p50/p95/p99, количество SQL-запросов и строк. '
+        'Может сохранить результат как эталон и сравнить с эталоном.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20,
+            help='Количество замеряемых проходов по эндпоинтам.',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=1,
+            help='Количество проходов перед замерами.',
+        )
+        add_seed_arguments(parser)
+        parser.set_defaults(
+            users=200,
+            recipes=1000,
+            ingredients=500,
+            follows=4000,
+            favorites=6000,
+            cart=2000,
+        )
+        parser.add_argument(
+            '--baseline-write',
+            metavar='PATH',
+            help='Сохранить результаты в JSON-файл эталона.',
+        )
+        parser.add_argument(
+            '--baseline-compare',
+            metavar='PATH',
+            help='Сравнить результаты с JSON-файлом эталона.',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help=(
+                'Допустимый относительный рост p95 и количества строк '
+                'при сравнении с эталоном.'
+            ),
+        )
+
+    def handle(self, *args, **kwargs):
+        if kwargs['iterations'] < 1:
+            raise CommandError('Количество проходов должно быть больше 0.')
+        baseline = None
+        if kwargs['baseline_compare']:
+            with open(kwargs['baseline_compare'], encoding='utf-8') as file:
+                baseline = json.load(file)
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            with tempfile.TemporaryDirectory() as media_root:
+                with override_settings(
+                    CACHES=BENCHMARK_CACHES, MEDIA_ROOT=media_root
+                ):
+                    self.seed(kwargs)
+                    try:
+                        results = self.run(kwargs)
+                    finally:
+                        wait_for_variants()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        self.report(results)
+        if kwargs['baseline_write']:
+            with open(
+                kwargs['baseline_write'], 'w', encoding='utf-8'
+            ) as file:
+                json.dump(
+                    {'options': self.dataset_options(kwargs),
+                     'endpoints': results},
+                    file,
+                    ensure_ascii=False,
+                    indent=2,
+                )
+        if baseline is not None:
+            self.compare(results, baseline, kwargs['tolerance'])
+
+    @staticmethod
+    def dataset_options(kwargs):
+        """Параметры набора данных и прогона для записи в эталон."""
+        return {
+            name: kwargs[name]
+            for name in (
+                'iterations',
+                'seed',
+                'users',
+                'recipes',
+                'ingredients',
+                'tags',
+                'recipe_ingredients',
+                'recipe_tags',
+                'follows',
+                'favorites',
+                'cart',
+                'zipf',
+                'days',
+            )
+        }
+
+    def seed(self, kwargs):
+        """Заполнение тестовой базы синтетическими данными."""
+        counts = Seeder(kwargs).seed()
+        for command in ('recount', 'rebuildshoppinglists', 'rebuildfeeds'):
+            call_command(command, stdout=io.StringIO())
+        summary = ', '.join(
+            f'{name} {count}' for name, count in counts.items()
+        )
+        self.stderr.write(f'Создано: {summary}.')
+
+    def prepare(self):
+        """Клиенты и объекты, к которым обращаются эндпоинты."""
+        self.user = (
+            User.objects.annotate(cart=Count('in_shopping_cart'))
+            .order_by('-cart', 'pk')
+            .first()
+        )
+        self.anonymous = APIClient()
+        self.client = APIClient()
+        token, _ = Token.objects.get_or_create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.recipe = Recipe.objects.order_by('-favorites_count').first()
+        self.other_recipe = (
+            Recipe.objects.exclude(author=self.user).order_by('pk').first()
+        )
+        Favorites.objects.filter(
+            user=self.user, recipe=self.other_recipe
+        ).delete()
+        ShoppingCart.objects.filter(
+            user=self.user, recipe=self.other_recipe
+        ).delete()
+        self.author = (
+            User.objects.exclude(pk=self.user.pk).order_by('pk').first()
+        )
+        Follow.objects.filter(user=self.user, following=self.author).delete()
+        self.tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+        self.recipe_data = {
+            'tags': list(Tag.objects.values_list('id', flat=True)[:2]),
+            'ingredients': [
+                {'id': ingredient_id, 'amount': 10}
+                for ingredient_id in Ingredient.objects.values_list(
+                    'id', flat=True
+                )[:3]
+            ],
+            'name': 'Рецепт для замеров',
+            'text': 'Описание рецепта для замеров',
+            'cooking_time': 15,
+            'image': self.image_data((40, 40)),
+        }
+        self.avatar_data = {'avatar': self.image_data((20, 20))}
+
+    @staticmethod
+    def image_data(size):
+        """Изображение PNG в виде data URI."""
+        buffer = io.BytesIO()
+        Image.new('RGB', size, (200, 120, 40)).save(buffer, 'PNG')
+        encoded = base64.b64encode(buffer.getvalue()).decode()
+        return f'data:image/png;base64,{encoded}'
+
+    def measure(self, name, client, method, path, data=None, status=None):
+        """Выполнение запроса с замером задержки, запросов и строк."""
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            response = client.generic(
+                method,
+                path,
+                json.dumps(data) if data is not None else '',
+                'application/json',
+            )
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = (time.perf_counter() - started) * 1000
+        if status is not None and response.status_code != status:
+            raise CommandError(
+                f'{name}: ожидался статус {status}, '
+                f'получен {response.status_code}.'
+            )
+        if self.samples is not None:
+            samples = self.samples.setdefault(
+                name, {'latency': [], 'queries': [], 'rows': []}
+            )
+            samples['latency'].append(elapsed)
+            samples['queries'].append(counter.queries)
+            samples['rows'].append(counter.rows)
+        return response
+
+    def iteration(self):
+        """Один проход по всем эндпоинтам API."""
+        anonymous, client = self.anonymous, self.client
+        recipe, other = self.recipe.pk, self.other_recipe.pk
+        author = self.author.pk
+        tags = '&'.join(f'tags={slug}' for slug in self.tags)
+        reads = (
+            ('recipes list anonymous', anonymous, '/api/recipes/'),
+            ('recipes list', client, '/api/recipes/'),
+            ('recipes list tags', anonymous, f'/api/recipes/?{tags}'),
+            (
+                'recipes list favorited',
+                client,
+                '/api/recipes/?is_favorited=1',
+            ),
+            (
+                'recipes list in cart',
+                client,
+                '/api/recipes/?is_in_shopping_cart=1',
+            ),
+            (
+                'recipes list author',
+                anonymous,
+                f'/api/recipes/?author={author}',
+            ),
+            (
+                'recipes list popular',
+                anonymous,
+                '/api/recipes/?ordering=-favorites_count',
+            ),
+            ('recipes search', anonymous, '/api/recipes/?search=Рецепт'),
+            ('recipes cursor', client, '/api/recipes/?cursor='),
+            ('recipes feed', client, '/api/recipes/feed/'),
+            ('recipe detail', client, f'/api/recipes/{recipe}/'),
+            ('recipe get-link', anonymous, f'/api/recipes/{recipe}/get-link/'),
+            (
+                'shopping cart summary',
+                client,
+                '/api/recipes/shopping_cart/summary/',
+            ),
+            ('users list', anonymous, '/api/users/'),
+            ('users me', client, '/api/users/me/'),
+            ('user detail', anonymous, f'/api/users/{author}/'),
+            ('users subscriptions', client, '/api/users/subscriptions/'),
+            ('tags list', anonymous, '/api/tags/'),
+            ('ingredients search', anonymous, '/api/ingredients/?name=инг'),
+        )
+        for name, user_client, path in reads:
+            self.measure(name, user_client, 'GET', path, status=200)
+        for file_format in ('txt', 'csv', 'json'):
+            self.measure(
+                f'download shopping cart {file_format}',
+                client,
+                'GET',
+                f'/api/recipes/download_shopping_cart/?format={file_format}',
+                status=200,
+            )
+        self.measure(
+            'short link redirect',
+            anonymous,
+            'GET',
+            f'/s/{self.recipe.short_link}/',
+            status=302,
+        )
+        for action in ('favorite', 'shopping_cart'):
+            path = f'/api/recipes/{other}/{action}/'
+            self.measure(f'{action} add', client, 'POST', path, status=201)
+            self.measure(
+                f'{action} remove', client, 'DELETE', path, status=204
+            )
+        path = f'/api/users/{author}/subscribe/'
+        self.measure('subscribe', client, 'POST', path, status=201)
+        self.measure('unsubscribe', client, 'DELETE', path, status=204)
+        path = '/api/users/me/avatar/'
+        self.measure(
+            'avatar set', client, 'PUT', path, self.avatar_data, status=200
+        )
+        self.measure('avatar delete', client, 'DELETE', path, status=204)
+        response = self.measure(
+            'recipe create',
+            client,
+            'POST',
+            '/api/recipes/',
+            self.recipe_data,
+            status=201,
+        )
+        path = f'/api/recipes/{response.json()["id"]}/'
+        self.measure(
+            'recipe update',
+            client,
+            'PATCH',
+            path,
+            {**self.recipe_data, 'name': 'Измененный рецепт'},
+            status=200,
+        )
+        self.measure('recipe delete', client, 'DELETE', path, status=204)
+
+    def run(self, kwargs):
+        """Прогрев и замеры всех эндпоинтов."""
+        self.prepare()
+        self.samples = None
+        for _ in range(kwargs['warmup']):
+            self.iteration()
+        self.samples = {}
+        for _ in range(kwargs['iterations']):
+            self.iteration()
+        results = {}
+        for name, samples in self.samples.items():
+            p50, p95, p99 = percentiles(samples['latency'])
+            rows = samples['rows']
+            results[name] = {
+                'p50': round(p50, 3),
+                'p95': round(p95, 3),
+                'p99': round(p99, 3),
+                'queries': max(samples['queries']),
+                'rows': None if None in rows else max(rows),
+            }
+        return results
+
+    def report(self, results):
+        """Вывод таблицы результатов."""
+        width = max(map(len, results))
+        self.stdout.write(
+            f'{"эндпоинт":<{width}}  {"p50, мс":>9}  {"p95, мс":>9}  '
+            f'{"p99, мс":>9}  {"запросы":>7}  {"строки":>7}'
+        )
+        for name, result in results.items():
+            rows = '-' if result['rows'] is None else result['rows']
+            self.stdout.write(
+                f'{name:<{width}}  {result["p50"]:>9.2f}  '
+                f'{result["p95"]:>9.2f}  {result["p99"]:>9.2f}  '
+                f'{result["queries"]:>7}  {rows:>7}'
+            )
+
+    def compare(self, results, baseline, tolerance):
+        """Сравнение с эталоном, при регрессии команда завершается ошибкой.
+
+        Количество запросов не должно расти совсем, p95 и количество
+        строк — не больше чем на долю `tolerance`.
+        """
+        regressions = []
+        for name, expected in baseline['endpoints'].items():
+            actual = results.get(name)
+            if actual is None:
+                regressions.append(f'{name}: эндпоинт не замерялся')
+                continue
+            if actual['queries'] > expected['queries']:
+                regressions.append(
+                    f'{name}: запросов {actual["queries"]} '
+                    f'вместо {expected["queries"]}'
+                )
+            for key in ('p95', 'rows'):
+                if actual[key] is None or expected[key] is None:
+                    continue
+                if actual[key] > expected[key] * (1 + tolerance):
+                    regressions.append(
+                        f'{name}: {key} {actual[key]} '
+                        f'вместо {expected[key]}'
+                    )
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(regression)
+            raise CommandError(
+                f'Найдены регрессии относительно эталона: {len(regressions)}.'
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий не найдено.'))
@@ -0,0 +1,69 @@
+import datetime
+import sys
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from recipes.constants import DUMP_CHUNK_SIZE
+from recipes.management.graph import GRAPH
+
+
+class DumpEncoder(DjangoJSONEncoder):
+    """JSON без отбрасывания микросекунд у дат."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class Command(BaseCommand):
+    """Потоковая выгрузка рецептов, пользователей и их связей в NDJSON."""
+
+    help = (
+        'Выгружает пользователей, теги, ингредиенты, рецепты, избранное, '
+        'списки покупок и подписки в NDJSON по одному объекту в строке.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-o',
+            '--output',
+            help='Файл для выгрузки, по умолчанию стандартный вывод.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DUMP_CHUNK_SIZE,
+            help='Количество строк, читаемых из БД за раз.',
+        )
+
+    def dump(self, output, chunk_size):
+        encoder = DumpEncoder(ensure_ascii=False)
+        counts = {}
+        for name, model, fields in GRAPH:
+            rows = (
+                model.objects.order_by('pk')
+                .values_list(*fields)
+                .iterator(chunk_size=chunk_size)
+            )
+            count = 0
+            for row in rows:
+                output.write(
+                    encoder.encode({'model': name, **dict(zip(fields, row))})
+                )
+                output.write('\n')
+                count += 1
+            counts[name] = count
+        return counts
+
+    def handle(self, *args, **kwargs):
+        if kwargs['output']:
+            with open(kwargs['output'], 'w', encoding='utf-8') as output:
+                counts = self.dump(output, kwargs['chunk_size'])
+        else:
+            counts = self.dump(sys.stdout, kwargs['chunk_size'])
+        summary = ', '.join(
+            f'{name} {count}' for name, count in counts.items()
+        )
+        self.stderr.write(self.style.SUCCESS(f'Выгружено: {summary}.'))
@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from recipes.images import update_variants
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """Создание уменьшенных копий загруженных изображений."""
+
+    help = (
+        'Создаёт уменьшенные копии изображений рецептов и аватаров, '
+        'у которых их ещё нет. С ключом --rewrite пересоздаёт все копии.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rewrite',
+            action='store_true',
+            help='Пересоздать уже существующие копии.',
+        )
+
+    def handle(self, *args, **kwargs):
+        for model, field_name, variants_name in (
+            (Recipe, 'image', 'image_variants'),
+            (User, 'avatar', 'avatar_variants'),
+        ):
+            queryset = (
+                model.objects.exclude(**{field_name: ''})
+                .exclude(**{f'{field_name}__isnull': True})
+                .only('id', field_name, variants_name)
+                .order_by('id')
+            )
+            if not kwargs['rewrite']:
+                queryset = queryset.filter(**{variants_name: {}})
+            updated = 0
+            for instance in queryset.iterator():
+                try:
+                    updated += update_variants(
+                        instance, field_name, variants_name
+                    )
+                except (OSError, ValueError) as error:
+                    name = getattr(instance, field_name).name
+                    self.stderr.write(f'{name}: {error}')
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'{model._meta.verbose_name_plural}: '
+                    f'обновлено {updated}.'
+                )
+            )
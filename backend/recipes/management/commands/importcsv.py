@@ -1,60 +1,226 @@
 import csv
+import json
 import os
+from itertools import islice
 
-from django.core.exceptions import ValidationError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 
+from recipes.cache import bump_version
+from recipes.constants import (
+    IMPORT_BATCH_SIZE,
+    IMPORT_READ_SIZE,
+    INGREDIENT_NAME_MAX_LENGTH,
+    INGREDIENT_UNIT_MAX_LENGTH,
+    INGREDIENTS_CATALOG,
+    RECIPES_GENERATION,
+)
+from recipes.management.bulk import CsvStream
 from recipes.models import Ingredient
 
+FORMATS = ('csv', 'json')
+
+
+def read_csv(file):
+    """Построчное чтение пар (название, единица) из CSV."""
+    for row in csv.reader(file):
+        if len(row) != 2:
+            yield None
+            continue
+        yield row
+
+
+def read_json(file):
+    """Потоковое чтение массива JSON-объектов без загрузки файла целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    while True:
+        chunk = file.read(IMPORT_READ_SIZE)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started and position < len(buffer):
+                if buffer[position] != '[':
+                    raise CommandError('JSON-файл должен содержать массив.')
+                started = True
+                position += 1
+                continue
+            if buffer[position:position + 1] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise CommandError('Файл JSON обрывается или повреждён.')
+                break
+            if not isinstance(item, dict):
+                yield None
+                continue
+            yield item.get('name'), item.get('measurement_unit')
+        if not chunk:
+            raise CommandError('Файл JSON обрывается или повреждён.')
+
 
 class Command(BaseCommand):
-    """Импорт данных из файлов *.csv в БД."""
+    """Импорт ингредиентов из файлов CSV и JSON в БД."""
 
     help = (
-        'Импорт данных из файла ingredients.csv, '
-        'importcsv <путь к директории>.'
+        'Импорт ингредиентов из файла CSV или JSON: '
+        'importcsv <путь к файлу или директории>. В директории ищется '
+        'ingredients.csv, затем ingredients.json.'
     )
 
     def add_arguments(self, parser):
         parser.add_argument(
-            'dir', type=str, help='Папка с файлами для импорта данных'
+            'path', type=str, help='Файл или папка с файлами для импорта'
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Формат файла, по умолчанию определяется по расширению.',
+        )
+        parser.add_argument(
+            '--update',
+            action='store_true',
+            help='Обновить единицы измерения уже существующих ингредиентов.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help='Количество строк, записываемых одним запросом.',
         )
 
-    def get_file(self, dir):
-        """Чтение директории."""
-        list_dir = os.listdir(dir)
-        file = 'ingredients.csv'
-        if file not in list_dir:
-            raise ValidationError('Файл с данными отсутсвует!')
-        return file
+    def get_file(self, path):
+        """Поиск файла с данными и определение его формата."""
+        if os.path.isdir(path):
+            for file_format in FORMATS:
+                file = os.path.join(path, f'ingredients.{file_format}')
+                if os.path.isfile(file):
+                    return file
+            raise CommandError('Файл с данными отсутствует!')
+        if not os.path.isfile(path):
+            raise CommandError(f'Файл {path} не найден.')
+        return path
 
-    def create_object(self, data):
-        """Создание объекта модели."""
-        ingredient, state = Ingredient.objects.get_or_create(**data)
-        self.stdout.write(self.style.SUCCESS(f'Объект {ingredient} создан.'))
+    def clean_rows(self, rows):
+        """Проверка строк, неверные строки учитываются и пропускаются."""
+        for row in rows:
+            if row is None:
+                self.invalid += 1
+                continue
+            name, unit = row
+            if not isinstance(name, str) or not isinstance(unit, str):
+                self.invalid += 1
+                continue
+            name, unit = name.strip(), unit.strip()
+            if (
+                not name
+                or not unit
+                or len(name) > INGREDIENT_NAME_MAX_LENGTH
+                or len(unit) > INGREDIENT_UNIT_MAX_LENGTH
+            ):
+                self.invalid += 1
+                continue
+            self.valid += 1
+            yield name, unit
 
-    def handle(self, *args, **kwargs):
-        dir = kwargs['dir']
-        file = self.get_file(dir)
-        try:
-            with open(
-                dir + '/' + file, newline='', encoding='utf-8'
-            ) as csvfile:
-                reader = csv.DictReader(
-                    csvfile, fieldnames=['name', 'measurement_unit']
+    def import_batches(self, rows, update, batch_size):
+        """Импорт пачками через bulk_create, подходит для любой СУБД."""
+        inserted = updated = 0
+        while batch := dict(islice(rows, batch_size)):
+            existing = dict(
+                Ingredient.objects.filter(name__in=batch).values_list(
+                    'name', 'measurement_unit'
                 )
-                for row in reader:
-                    try:
-                        self.create_object(row)
-                    except Exception as e:
-                        self.stdout.write(
-                            self.style.WARNING(
-                                f'При импорте произошла ошибка: {e}.\n'
-                                f'Проверьте данные: {row}'
-                            )
-                        )
-                        continue
-        except Exception as e:
-            self.stdout.write(
-                self.style.ERROR(f'При импорте произошла ошибка {e}.')
             )
+            new = [
+                Ingredient(name=name, measurement_unit=unit)
+                for name, unit in batch.items()
+                if name not in existing
+            ]
+            inserted += len(
+                Ingredient.objects.bulk_create(new, ignore_conflicts=True)
+            )
+            if not update:
+                continue
+            changed = [
+                Ingredient(name=name, measurement_unit=unit)
+                for name, unit in batch.items()
+                if name in existing and existing[name] != unit
+            ]
+            Ingredient.objects.bulk_create(
+                changed,
+                update_conflicts=True,
+                unique_fields=('name',),
+                update_fields=('measurement_unit',),
+            )
+            updated += len(changed)
+        return inserted, updated
+
+    def import_copy(self, rows, update):
+        """Импорт через COPY во временную таблицу на PostgreSQL."""
+        table = Ingredient._meta.db_table
+        if update:
+            conflict = (
+                'DO UPDATE SET measurement_unit = EXCLUDED.measurement_unit '
+                f'WHERE {table}.measurement_unit '
+                'IS DISTINCT FROM EXCLUDED.measurement_unit'
+            )
+        else:
+            conflict = 'DO NOTHING'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE ingredient_import '
+                '(name text, measurement_unit text) ON COMMIT DROP'
+            )
+            cursor.copy_expert(
+                'COPY ingredient_import (name, measurement_unit) '
+                'FROM STDIN WITH (FORMAT csv)',
+                CsvStream(rows),
+            )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT ON (name) name, measurement_unit '
+                'FROM ingredient_import ORDER BY name '
+                f'ON CONFLICT (name) {conflict} '
+                'RETURNING xmax = 0'
+            )
+            results = [inserted for inserted, in cursor.fetchall()]
+        return results.count(True), results.count(False)
+
+    def handle(self, *args, **kwargs):
+        file = self.get_file(kwargs['path'])
+        file_format = kwargs['format'] or os.path.splitext(file)[1][1:]
+        if file_format not in FORMATS:
+            raise CommandError(
+                f'Неизвестный формат файла {file}, укажите --format.'
+            )
+        self.valid = self.invalid = 0
+        with open(file, newline='', encoding='utf-8') as source:
+            reader = read_csv if file_format == 'csv' else read_json
+            rows = self.clean_rows(reader(source))
+            with transaction.atomic():
+                if connection.vendor == 'postgresql':
+                    inserted, updated = self.import_copy(
+                        rows, kwargs['update']
+                    )
+                else:
+                    inserted, updated = self.import_batches(
+                        rows, kwargs['update'], kwargs['batch_size']
+                    )
+        if inserted or updated:
+            bump_version(INGREDIENTS_CATALOG)
+        if updated:
+            bump_version(RECIPES_GENERATION)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Добавлено: {inserted}, обновлено: {updated}, '
+                f'пропущено: {self.valid - inserted - updated}, '
+                f'с ошибками: {self.invalid}.'
+            )
+        )
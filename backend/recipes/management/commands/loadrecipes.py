@@ -0,0 +1,202 @@
+import json
+import sys
+from functools import partial
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from recipes.cache import bump_version
+from recipes.constants import (
+    IMPORT_BATCH_SIZE,
+    INGREDIENTS_CATALOG,
+    RECIPES_GENERATION,
+    TAGS_CATALOG,
+)
+from recipes.management.graph import MODELS
+from recipes.models import Recipe
+from recipes.utils import encode_short_link
+
+
+class Command(BaseCommand):
+    """Потоковая загрузка выгрузки dumprecipes с заменой id."""
+
+    help = (
+        'Загружает NDJSON-выгрузку команды dumprecipes. Объекты создаются '
+        'пачками с новыми id, существующие пользователи, теги и '
+        'ингредиенты сопоставляются по email/username, slug и названию. '
+        'После загрузки пересчитываются счетчики, списки покупок и ленты.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input', help='Файл выгрузки, "-" для стандартного ввода.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help='Количество объектов, создаваемых одним запросом.',
+        )
+
+    def read_batches(self, source, batch_size):
+        """Группировка подряд идущих записей одной модели в пачки."""
+        name, batch = None, []
+        for number, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                raise CommandError(f'Строка {number}: некорректный JSON.')
+            model = record.pop('model', None)
+            if model not in self.loaders:
+                raise CommandError(
+                    f'Строка {number}: неизвестная модель {model}.'
+                )
+            if model != name or len(batch) >= batch_size:
+                if batch:
+                    yield name, batch
+                name, batch = model, []
+            batch.append(record)
+        if batch:
+            yield name, batch
+
+    def load_unique(self, name, keys, rows):
+        """Создание объектов с уникальными полями keys.
+
+        Уже существующие объекты не создаются заново, ссылки на них
+        заменяются на их id.
+        """
+        model = MODELS[name]
+        query = Q()
+        for key in keys:
+            query |= Q(**{f'{key}__in': [row[key] for row in rows]})
+        existing = {}
+        for pk, *values in model.objects.filter(query).values_list(
+            'pk', *keys
+        ):
+            existing.update(
+                ((key, value), pk) for key, value in zip(keys, values)
+            )
+        ids = self.ids[name]
+        new = []
+        for row in rows:
+            old_id = row.pop('id')
+            pk = next(
+                (
+                    existing[key, row[key]]
+                    for key in keys
+                    if (key, row[key]) in existing
+                ),
+                None,
+            )
+            if pk is None:
+                new.append((old_id, model(**row)))
+            else:
+                ids[old_id] = pk
+        created = model.objects.bulk_create([obj for _, obj in new])
+        for (old_id, _), obj in zip(new, created):
+            ids[old_id] = obj.pk
+        return len(created)
+
+    def load_recipes(self, rows):
+        """Создание рецептов с исходной датой публикации."""
+        recipes = []
+        for row in rows:
+            author = self.ids['user'].get(row.pop('author'))
+            if author is None:
+                self.skipped += 1
+                continue
+            recipe = Recipe(author_id=author, **row)
+            recipe.old_id = recipe.id
+            recipe.id = None
+            recipes.append(recipe)
+        pub_dates = [parse_datetime(recipe.pub_date) for recipe in recipes]
+        Recipe.objects.bulk_create(recipes)
+        # auto_now_add заменяет дату при создании, возвращаем исходную
+        # и заполняем короткие ссылки, когда id уже известны.
+        for recipe, pub_date in zip(recipes, pub_dates):
+            recipe.pub_date = pub_date
+            recipe.short_link = encode_short_link(recipe.pk)
+            self.ids['recipe'][recipe.old_id] = recipe.pk
+        Recipe.objects.bulk_update(recipes, ('pub_date', 'short_link'))
+        return len(recipes)
+
+    def load_links(self, name, references, rows):
+        """Создание связей с заменой id связанных объектов."""
+        model = MODELS[name]
+        objects = []
+        for row in rows:
+            try:
+                for field, target in references.items():
+                    row[f'{field}_id'] = self.ids[target][row.pop(field)]
+            except KeyError:
+                self.skipped += 1
+                continue
+            objects.append(model(**row))
+        model.objects.bulk_create(objects, ignore_conflicts=True)
+        return len(objects)
+
+    def load(self, source, batch_size):
+        counts = dict.fromkeys(self.loaders, 0)
+        for name, batch in self.read_batches(source, batch_size):
+            counts[name] += self.loaders[name](batch)
+        return counts
+
+    def handle(self, *args, **kwargs):
+        self.ids = {'user': {}, 'tag': {}, 'ingredient': {}, 'recipe': {}}
+        self.skipped = 0
+        self.loaders = {
+            'user': partial(self.load_unique, 'user', ('email', 'username')),
+            'tag': partial(self.load_unique, 'tag', ('slug',)),
+            'ingredient': partial(self.load_unique, 'ingredient', ('name',)),
+            'recipe': self.load_recipes,
+            'ingredientinrecipe': partial(
+                self.load_links,
+                'ingredientinrecipe',
+                {'recipe': 'recipe', 'ingredient': 'ingredient'},
+            ),
+            'recipetag': partial(
+                self.load_links,
+                'recipetag',
+                {'recipe': 'recipe', 'tag': 'tag'},
+            ),
+            'favorites': partial(
+                self.load_links,
+                'favorites',
+                {'user': 'user', 'recipe': 'recipe'},
+            ),
+            'shoppingcart': partial(
+                self.load_links,
+                'shoppingcart',
+                {'user': 'user', 'recipe': 'recipe'},
+            ),
+            'follow': partial(
+                self.load_links,
+                'follow',
+                {'user': 'user', 'following': 'user'},
+            ),
+        }
+        with transaction.atomic():
+            if kwargs['input'] == '-':
+                counts = self.load(sys.stdin, kwargs['batch_size'])
+            else:
+                with open(kwargs['input'], encoding='utf-8') as source:
+                    counts = self.load(source, kwargs['batch_size'])
+            call_command('recount', stdout=self.stdout)
+            call_command('rebuildshoppinglists', stdout=self.stdout)
+            call_command('rebuildfeeds', stdout=self.stdout)
+        for version in (INGREDIENTS_CATALOG, TAGS_CATALOG, RECIPES_GENERATION):
+            bump_version(version)
+        summary = ', '.join(
+            f'{name} {count}' for name, count in counts.items()
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Загружено: {summary}. '
+                f'Пропущено без связанных объектов: {self.skipped}.'
+            )
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.feed import rebuild_feeds
+
+
+class Command(BaseCommand):
+    """Пересоздание лент подписок."""
+
+    help = (
+        'Пересоздает ленты подписок по текущим подпискам и счетчикам '
+        'подписчиков авторов.'
+    )
+
+    def handle(self, *args, **kwargs):
+        with transaction.atomic():
+            count = rebuild_feeds()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Ленты подписок пересозданы, записей: {count}.'
+            )
+        )
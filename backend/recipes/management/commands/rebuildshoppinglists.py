@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from recipes.shopping_list import find_mismatches, rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    """Проверка и пересоздание сводных списков покупок."""
+
+    help = (
+        'Сверяет сводные списки покупок со списками покупок пользователей '
+        'и пересоздает их, с ключом --check только выводит расхождения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить, не изменяя данные.',
+        )
+
+    def handle(self, *args, **kwargs):
+        mismatches = find_mismatches()
+        if not mismatches:
+            self.stdout.write(
+                self.style.SUCCESS('Сводные списки покупок согласованы.')
+            )
+            return
+        self.stdout.write(
+            self.style.WARNING(
+                'Найдены расхождения: '
+                f'отсутствует строк {mismatches["missing"]}, '
+                f'лишних строк {mismatches["extra"]}, '
+                f'с другим количеством {mismatches["amount"]}.'
+            )
+        )
+        if kwargs['check']:
+            return
+        count = rebuild_shopping_lists()
+        self.stdout.write(
+            self.style.SUCCESS(f'Списки покупок пересозданы, строк: {count}.')
+        )
@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorites, Recipe, ShoppingCart
+from users.models import Follow, User
+
+
+def count_subquery(model, field):
+    """Подзапрос количества строк `model`, ссылающихся полем `field`."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(count=Count('pk'))
+            .values('count')
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    """Пересчет счетчиков рецептов и пользователей."""
+
+    help = (
+        'Пересчитывает счетчики избранного и списков покупок рецептов, '
+        'количество рецептов и подписчиков пользователей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Количество строк, обновляемых одним запросом.',
+        )
+
+    def update_in_batches(self, queryset, batch_size, **counters):
+        """Обновление счетчиков диапазонами id."""
+        last_id = queryset.order_by('-pk').values_list('pk', flat=True)
+        last_id = last_id.first() or 0
+        updated = 0
+        for start in range(0, last_id + 1, batch_size):
+            updated += queryset.filter(
+                pk__gte=start, pk__lt=start + batch_size
+            ).update(**counters)
+        return updated
+
+    def handle(self, *args, **kwargs):
+        batch_size = kwargs['batch_size']
+        recipes = self.update_in_batches(
+            Recipe.objects.all(),
+            batch_size,
+            favorites_count=count_subquery(Favorites, 'recipe'),
+            shopping_cart_count=count_subquery(ShoppingCart, 'recipe'),
+        )
+        users = self.update_in_batches(
+            User.objects.all(),
+            batch_size,
+            recipes_count=count_subquery(Recipe, 'author'),
+            followers_count=count_subquery(Follow, 'following'),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Пересчитаны счетчики рецептов: {recipes}, '
+                f'пользователей: {users}.'
+            )
+        )
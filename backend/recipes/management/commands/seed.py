@@ -0,0 +1,38 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.cache import bump_version
+from recipes.constants import (
+    INGREDIENTS_CATALOG,
+    RECIPES_GENERATION,
+    TAGS_CATALOG,
+)
+from recipes.management.seeding import Seeder, add_seed_arguments
+
+
+class Command(BaseCommand):
+    """Генерация синтетических данных."""
+
+    help = (
+        'Создает пользователей, рецепты с ингредиентами из каталога, теги, '
+        'подписки, избранное и списки покупок с популярностью по закону '
+        'Ципфа. Результат повторяется при одинаковом --seed. После '
+        'генерации пересчитывает счетчики, сводные списки покупок и ленты.'
+    )
+
+    def add_arguments(self, parser):
+        add_seed_arguments(parser)
+
+    def handle(self, *args, **kwargs):
+        with transaction.atomic():
+            counts = Seeder(kwargs, log=self.stderr.write).seed()
+            call_command('recount', stdout=self.stdout)
+            call_command('rebuildshoppinglists', stdout=self.stdout)
+            call_command('rebuildfeeds', stdout=self.stdout)
+        for version in (INGREDIENTS_CATALOG, TAGS_CATALOG, RECIPES_GENERATION):
+            bump_version(version)
+        summary = ', '.join(
+            f'{name} {count}' for name, count in counts.items()
+        )
+        self.stdout.write(self.style.SUCCESS(f'Создано: {summary}.'))
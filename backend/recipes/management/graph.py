@@ -0,0 +1,67 @@
+"""Состав выгрузки рецептов для команд dumprecipes и loadrecipes.
+
+Модели перечислены в порядке зависимостей: при загрузке связанные
+объекты всегда встречаются в файле раньше ссылающихся на них.
+"""
+from django.contrib.auth import get_user_model
+
+from recipes.models import (
+    Favorites,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    RecipeTag,
+    ShoppingCart,
+    Tag,
+)
+from users.models import Follow
+
+User = get_user_model()
+
+GRAPH = (
+    (
+        'user',
+        User,
+        (
+            'id',
+            'email',
+            'username',
+            'first_name',
+            'last_name',
+            'password',
+            'avatar',
+            'avatar_variants',
+            'is_active',
+            'date_joined',
+        ),
+    ),
+    ('tag', Tag, ('id', 'name', 'slug')),
+    ('ingredient', Ingredient, ('id', 'name', 'measurement_unit')),
+    (
+        'recipe',
+        Recipe,
+        (
+            'id',
+            'author',
+            'name',
+            'text',
+            'image',
+            'image_variants',
+            'cooking_time',
+            'pub_date',
+        ),
+    ),
+    (
+        'ingredientinrecipe',
+        IngredientInRecipe,
+        ('recipe', 'ingredient', 'amount'),
+    ),
+    ('recipetag', RecipeTag, ('recipe', 'tag')),
+    ('favorites', Favorites, ('user', 'recipe')),
+    ('shoppingcart', ShoppingCart, ('user', 'recipe')),
+    ('follow', Follow, ('user', 'following')),
+)
+"""Имя записи, модель и поля (внешние ключи выгружаются как id)."""
+
+MODELS = {name: model for name, model, _ in GRAPH}
+"""Модели по имени записи."""
@@ -0,0 +1,379 @@
+"""Генерация синтетических данных для команд seed и benchmark.
+
+Популярность авторов и рецептов, а также частота ингредиентов
+распределены по закону Ципфа: вес объекта с рангом r равен 1 / r^s.
+Ранги назначаются перемешиванием, поэтому популярность не связана с id.
+Результат детерминирован для одного значения `--seed` и одинакового
+начального состояния БД. Счетчики, сводные списки покупок и ленты
+подписок генератор не заполняет, их пересчитывают соответствующие
+команды.
+"""
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from recipes.constants import (
+    MAX_AMOUNT,
+    MAX_COOK_TIME,
+    MIN_AMOUNT,
+    MIN_COOK_TIME,
+    SEED_BATCH_SIZE,
+)
+from recipes.management.bulk import insert_rows, reserve_ids
+from recipes.models import (
+    Favorites,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    RecipeTag,
+    ShoppingCart,
+    Tag,
+)
+from recipes.utils import encode_short_link
+from users.models import Follow, User
+
+SEED_PASSWORD = 'seed-password'
+ZIPF_SAMPLE_ROUNDS = 10
+
+
+def add_seed_arguments(parser):
+    """Параметры генерации данных."""
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Начальное значение генератора случайных чисел.',
+    )
+    parser.add_argument(
+        '--users', type=int, default=1000, help='Количество пользователей.'
+    )
+    parser.add_argument(
+        '--recipes', type=int, default=10000, help='Количество рецептов.'
+    )
+    parser.add_argument(
+        '--ingredients',
+        type=int,
+        default=0,
+        help=(
+            'Минимальный размер каталога ингредиентов, недостающие '
+            'ингредиенты создаются.'
+        ),
+    )
+    parser.add_argument(
+        '--tags',
+        type=int,
+        default=10,
+        help='Минимальное количество тегов, недостающие теги создаются.',
+    )
+    parser.add_argument(
+        '--recipe-ingredients',
+        type=int,
+        default=8,
+        help='Среднее количество ингредиентов в рецепте.',
+    )
+    parser.add_argument(
+        '--recipe-tags',
+        type=int,
+        default=3,
+        help='Наибольшее количество тегов рецепта.',
+    )
+    parser.add_argument(
+        '--follows',
+        type=int,
+        default=20000,
+        help='Примерное общее количество подписок.',
+    )
+    parser.add_argument(
+        '--favorites',
+        type=int,
+        default=100000,
+        help='Примерное общее количество рецептов в избранном.',
+    )
+    parser.add_argument(
+        '--cart',
+        type=int,
+        default=20000,
+        help='Примерное общее количество рецептов в списках покупок.',
+    )
+    parser.add_argument(
+        '--zipf',
+        type=float,
+        default=1.0,
+        help='Показатель распределения Ципфа для популярности.',
+    )
+    parser.add_argument(
+        '--days',
+        type=int,
+        default=365,
+        help='Период публикации рецептов в днях.',
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=SEED_BATCH_SIZE,
+        help='Количество строк, записываемых одним запросом.',
+    )
+
+
+def zipf_cum_weights(count, exponent):
+    """Накопленные веса рангов 1..count для `random.choices`."""
+    return list(
+        accumulate(1 / rank ** exponent for rank in range(1, count + 1))
+    )
+
+
+def zipf_sample(rng, population, cum_weights, k):
+    """Выборка `k` различных элементов с весами Ципфа.
+
+    Если за несколько раундов не набралось `k` различных элементов,
+    выборка дополняется равновероятно.
+    """
+    k = min(k, len(population))
+    chosen = {}
+    for _ in range(ZIPF_SAMPLE_ROUNDS):
+        if len(chosen) >= k:
+            break
+        chosen.update(
+            dict.fromkeys(
+                rng.choices(
+                    population, cum_weights=cum_weights, k=k - len(chosen)
+                )
+            )
+        )
+    if len(chosen) < k:
+        rest = [item for item in population if item not in chosen]
+        chosen.update(dict.fromkeys(rng.sample(rest, k - len(chosen))))
+    return list(chosen)
+
+
+class Seeder:
+    """Генератор синтетических данных."""
+
+    def __init__(self, options, log=None):
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.log = log or (lambda message: None)
+        self.counts = {}
+
+    def insert(self, model, fields, rows):
+        """Запись строк с подсчетом их количества."""
+        count = insert_rows(model, fields, rows, self.batch_size)
+        name = model._meta.model_name
+        self.counts[name] = self.counts.get(name, 0) + count
+        self.log(f'{name}: {count}')
+
+    def ranked(self, ids):
+        """Перемешанные id и накопленные веса Ципфа для них."""
+        ids = list(ids)
+        self.rng.shuffle(ids)
+        return ids, zipf_cum_weights(len(ids), self.options['zipf'])
+
+    def quotas(self, total, count):
+        """Случайное количество связей каждого из `count` объектов.
+
+        Количества распределены экспоненциально со средним
+        `total / count`, в сумме получается около `total`.
+        """
+        if not total or not count:
+            return [0] * count
+        mean = total / count
+        return [round(self.rng.expovariate(1 / mean)) for _ in range(count)]
+
+    def fill_catalog(self, model, minimum, make):
+        """Дополнение каталога до `minimum` объектов, список их id."""
+        ids = list(model.objects.order_by('pk').values_list('pk', flat=True))
+        if len(ids) < minimum:
+            model.objects.bulk_create(
+                (make(number) for number in range(len(ids), minimum)),
+                batch_size=self.batch_size,
+                ignore_conflicts=True,
+            )
+            ids = list(
+                model.objects.order_by('pk').values_list('pk', flat=True)
+            )
+        return ids
+
+    def seed_catalogs(self):
+        """Ингредиенты и теги."""
+        self.ingredients = self.fill_catalog(
+            Ingredient,
+            self.options['ingredients'],
+            lambda number: Ingredient(
+                name=f'ингредиент {number}', measurement_unit='г'
+            ),
+        )
+        if not self.ingredients:
+            raise CommandError(
+                'Каталог ингредиентов пуст: загрузите его командой '
+                'importcsv или укажите --ingredients.'
+            )
+        self.tags = self.fill_catalog(
+            Tag,
+            max(self.options['tags'], 1),
+            lambda number: Tag(name=f'Тег {number}', slug=f'seed-{number}'),
+        )
+
+    def seed_users(self):
+        """Пользователи."""
+        count = self.options['users']
+        start = reserve_ids(User, count)
+        password = make_password(SEED_PASSWORD)
+        now = timezone.now()
+        self.insert(
+            User,
+            (
+                'id',
+                'password',
+                'is_superuser',
+                'username',
+                'first_name',
+                'last_name',
+                'email',
+                'is_staff',
+                'is_active',
+                'date_joined',
+                'avatar',
+                'recipes_count',
+                'followers_count',
+                'avatar_variants',
+            ),
+            (
+                (
+                    pk,
+                    password,
+                    False,
+                    f'seed{pk}',
+                    f'Имя{pk}',
+                    f'Фамилия{pk}',
+                    f'seed{pk}@example.com',
+                    False,
+                    True,
+                    now,
+                    None,
+                    0,
+                    0,
+                    {},
+                )
+                for pk in range(start, start + count)
+            ),
+        )
+        self.users = list(range(start, start + count))
+
+    def seed_recipes(self):
+        """Рецепты, их ингредиенты и теги."""
+        count = self.options['recipes']
+        if count and not self.users:
+            raise CommandError('Для рецептов нужны пользователи.')
+        start = reserve_ids(Recipe, count)
+        authors, weights = self.ranked(self.users)
+        now = timezone.now()
+        step = timedelta(days=self.options['days']) / max(count, 1)
+        rng = self.rng
+        self.insert(
+            Recipe,
+            (
+                'id',
+                'name',
+                'text',
+                'image',
+                'author',
+                'cooking_time',
+                'short_link',
+                'pub_date',
+                'favorites_count',
+                'shopping_cart_count',
+                'image_variants',
+            ),
+            (
+                (
+                    pk,
+                    f'Рецепт {pk}',
+                    f'Описание рецепта {pk}',
+                    '',
+                    rng.choices(authors, cum_weights=weights)[0],
+                    rng.randint(MIN_COOK_TIME, min(MAX_COOK_TIME, 180)),
+                    encode_short_link(pk),
+                    now - step * (start + count - pk),
+                    0,
+                    0,
+                    {},
+                )
+                for pk in range(start, start + count)
+            ),
+        )
+        self.recipes = list(range(start, start + count))
+        ingredients, weights = self.ranked(self.ingredients)
+        mean = self.options['recipe_ingredients']
+        self.insert(
+            IngredientInRecipe,
+            ('recipe', 'ingredient', 'amount'),
+            (
+                (recipe, ingredient, rng.randint(MIN_AMOUNT, MAX_AMOUNT // 4))
+                for recipe in self.recipes
+                for ingredient in zipf_sample(
+                    rng,
+                    ingredients,
+                    weights,
+                    max(round(rng.gauss(mean, mean / 3)), 1),
+                )
+            ),
+        )
+        most_tags = min(max(self.options['recipe_tags'], 1), len(self.tags))
+        self.insert(
+            RecipeTag,
+            ('recipe', 'tag'),
+            (
+                (recipe, tag)
+                for recipe in self.recipes
+                for tag in rng.sample(self.tags, rng.randint(1, most_tags))
+            ),
+        )
+
+    def seed_links(self):
+        """Подписки, избранное и списки покупок."""
+        rng = self.rng
+        authors, weights = self.ranked(self.users)
+        quotas = self.quotas(self.options['follows'], len(self.users))
+        self.insert(
+            Follow,
+            ('user', 'following'),
+            (
+                (user, author)
+                for user, quota in zip(self.users, quotas)
+                for author in [
+                    author
+                    for author in zipf_sample(
+                        rng, authors, weights, quota + 1
+                    )
+                    if author != user
+                ][:quota]
+            ),
+        )
+        recipes, weights = self.ranked(self.recipes)
+        for model, total in (
+            (Favorites, self.options['favorites']),
+            (ShoppingCart, self.options['cart']),
+        ):
+            quotas = self.quotas(total, len(self.users))
+            self.insert(
+                model,
+                ('user', 'recipe'),
+                (
+                    (user, recipe)
+                    for user, quota in zip(self.users, quotas)
+                    for recipe in zipf_sample(rng, recipes, weights, quota)
+                ),
+            )
+
+    def seed(self):
+        """Генерация всех данных, количество строк по моделям."""
+        self.seed_catalogs()
+        self.seed_users()
+        self.seed_recipes()
+        self.seed_links()
+        return self.counts
@@ -0,0 +1,29 @@
+"""Общие операции миграций приложений recipes и users."""
+from django.db import migrations
+
+
+def upper_prefix_indexes(indexes):
+    """Операция создания индексов для префиксного поиска админки.
+
+    `indexes` — кортежи (имя индекса, таблица, столбец). Поиск
+    istartswith на PostgreSQL сравнивает UPPER(column::text) LIKE 'X%',
+    поэтому индекс строится по тому же выражению с text_pattern_ops.
+    На остальных СУБД операция ничего не делает.
+    """
+
+    def create_indexes(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for name, table, column in indexes:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {name} ON {table} '
+                f'(UPPER({column}::text) text_pattern_ops)'
+            )
+
+    def drop_indexes(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for name, _, _ in indexes:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+    return migrations.RunPython(create_indexes, drop_indexes)
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.15 on 2026-10-17 06:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0002_alter_recipe_options_alter_recipe_author"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="recipe",
+            name="short_link",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                max_length=150,
+                null=True,
+                unique=True,
+                verbose_name="короткая ссылка",
+            ),
+        ),
+    ]
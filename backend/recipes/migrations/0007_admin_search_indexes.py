@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from recipes.migration_utils import upper_prefix_indexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0006_recipe_favorites_count_recipe_shopping_cart_count_and_more"),
+    ]
+
+    operations = [
+        upper_prefix_indexes(
+            (
+                ("recipes_recipe_name_upper_idx", "recipes_recipe", "name"),
+                (
+                    "recipes_ingredient_name_upper_idx",
+                    "recipes_ingredient",
+                    "name",
+                ),
+            )
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.15 on 2026-10-17 06:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0009_recipe_search"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="favorites",
+            index=models.Index(
+                fields=["user", "recipe"], name="favorites_user_recipe_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipetag",
+            index=models.Index(
+                fields=["recipe", "tag"], name="recipetag_recipe_tag_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="shoppingcart",
+            index=models.Index(
+                fields=["user", "recipe"], name="shoppingcart_user_recipe_idx"
+            ),
+        ),
+    ]
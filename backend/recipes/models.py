@@ -1,12 +1,20 @@
+from functools import partial
+
 from django.contrib.auth import get_user_model
 from django.core.validators import (
     MaxValueValidator,
     MinValueValidator,
     RegexValidator,
 )
-from django.db import models
+from django.db import models, transaction
 
 from recipes import constants
+from recipes.images import (
+    delete_variants,
+    refresh_variants,
+    schedule_variants,
+)
+from recipes.utils import encode_short_link
 
 User = get_user_model()
 
@@ -118,17 +126,61 @@ class Recipe(models.Model):
         db_index=True,
         max_length=constants.LINK_MAX_LENGTH,
         unique=True,
+        blank=True,
+        null=True,
     )
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    favorites_count = models.PositiveIntegerField(
+        'В избранном', default=0, editable=False
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        'В списках покупок', default=0, editable=False
+    )
+    image_variants = models.JSONField(
+        'Уменьшенные копии изображения',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'), name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=('-favorites_count', '-id'),
+                name='recipe_favorites_count_idx',
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='recipe_author_pub_date_idx',
+            ),
+        )
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        stale_variants, image_changed = refresh_variants(
+            self, 'image', 'image_variants', kwargs
+        )
+        super().save(*args, **kwargs)
+        if stale_variants:
+            transaction.on_commit(
+                partial(delete_variants, self.image, stale_variants)
+            )
+        if image_changed:
+            schedule_variants(self, 'image', 'image_variants')
+        if not self.short_link:
+            self.short_link = encode_short_link(self.pk)
+            Recipe.objects.filter(pk=self.pk).update(
+                short_link=self.short_link
+            )
+
 
 class IngredientInRecipe(models.Model):
     """Ингредиенты в рецепте.
@@ -183,6 +235,11 @@ class RecipeTag(models.Model):
     class Meta:
         verbose_name = 'Теги рецепта'
         verbose_name_plural = 'Теги рецептов'
+        indexes = (
+            models.Index(
+                fields=('recipe', 'tag'), name='recipetag_recipe_tag_idx'
+            ),
+        )
 
     def __str__(self):
         return f'{self.recipe.name} {self.tag.name}'
@@ -204,6 +261,11 @@ class UserRecipeModel(models.Model):
 
     class Meta:
         abstract = True
+        indexes = (
+            models.Index(
+                fields=('user', 'recipe'), name='%(class)s_user_recipe_idx'
+            ),
+        )
 
     def __str__(self):
         return f'{self.user.username} {self.recipe.name}'
@@ -217,7 +279,7 @@ class ShoppingCart(UserRecipeModel):
     Хранит рецепты, помещенные в список покупок пользователя.
     """
 
-    class Meta:
+    class Meta(UserRecipeModel.Meta):
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
         default_related_name = 'in_shopping_cart'
@@ -231,7 +293,95 @@ class Favorites(UserRecipeModel):
     Хранит рецепты, помещенные в список избранного пользователя.
     """
 
-    class Meta:
+    class Meta(UserRecipeModel.Meta):
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранное'
         default_related_name = 'favorited'
+
+
+class ShoppingListItem(models.Model):
+    """Сводный список покупок.
+
+    Денормализованная модель: хранит суммарное количество каждого
+    ингредиента по всем рецептам из списка покупок пользователя.
+    Обновляется при добавлении и удалении рецептов из списка покупок
+    и при изменении ингредиентов рецептов.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='shopping_list',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент',
+        related_name='+',
+    )
+    amount = models.PositiveIntegerField('Количество ингредиента')
+
+    class Meta:
+        verbose_name = 'Ингредиент списка покупок'
+        verbose_name_plural = 'Сводные списки покупок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_list_item',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user.username} {self.ingredient.name} {self.amount}'
+
+
+class FeedItem(models.Model):
+    """Лента подписок.
+
+    Рецепты авторов, на которых подписан пользователь, записываются
+    в его ленту при публикации и при оформлении подписки. Рецепты
+    авторов с большим числом подписчиков в ленты не записываются
+    и выбираются при чтении ленты.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='feed',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт',
+        related_name='+',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Автор',
+        related_name='+',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'), name='unique_feed_item'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-recipe'),
+                name='feeditem_user_pub_date_idx',
+            ),
+            models.Index(
+                fields=('user', 'author'), name='feeditem_user_author_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user} {self.recipe_id}'
@@ -0,0 +1,68 @@
+"""Полнотекстовый поиск рецептов по названию и описанию.
+
+На PostgreSQL используется столбец search_vector (название с весом A,
+описание с весом B), который заполняет триггер, и GIN-индекс по нему.
+На SQLite — внешняя таблица FTS5 recipes_recipe_fts, синхронизируемая
+триггерами. Обе структуры создаются миграцией 0009_recipe_search.
+"""
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from recipes.constants import SEARCH_CONFIG, SEARCH_QUERY_MAX_LENGTH
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def get_fts5_query(query):
+    """Запрос FTS5 из слов пользователя: все слова, каждое как префикс."""
+    return ' '.join(f'"{token}"*' for token in TOKEN_RE.findall(query))
+
+
+def search_recipes(queryset, query):
+    """Отбор рецептов по запросу с сортировкой по релевантности."""
+    query = query.strip()[:SEARCH_QUERY_MAX_LENGTH]
+    if connection.vendor == 'postgresql':
+        tsquery = 'websearch_to_tsquery(%s::regconfig, %s)'
+        params = (SEARCH_CONFIG, query)
+        queryset = queryset.filter(
+            RawSQL(
+                f'"recipes_recipe"."search_vector" @@ {tsquery}',
+                params,
+                output_field=BooleanField(),
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f'ts_rank_cd("recipes_recipe"."search_vector", {tsquery})',
+                params,
+                output_field=FloatField(),
+            )
+        )
+    elif connection.vendor == 'sqlite':
+        match = get_fts5_query(query)
+        if not match:
+            return queryset.none()
+        queryset = queryset.filter(
+            RawSQL(
+                '"recipes_recipe"."id" IN (SELECT rowid FROM '
+                'recipes_recipe_fts WHERE recipes_recipe_fts MATCH %s)',
+                (match,),
+                output_field=BooleanField(),
+            )
+        ).annotate(
+            # bm25 тем меньше, чем документ релевантнее.
+            search_rank=RawSQL(
+                '(SELECT -bm25(recipes_recipe_fts, 10.0, 1.0) FROM '
+                'recipes_recipe_fts WHERE recipes_recipe_fts MATCH %s '
+                'AND rowid = "recipes_recipe"."id")',
+                (match,),
+                output_field=FloatField(),
+            )
+        )
+    else:
+        return queryset.filter(
+            Q(name__icontains=query) | Q(text__icontains=query)
+        )
+    return queryset.order_by('-search_rank', '-pub_date', '-id')
@@ -0,0 +1,193 @@
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Sum
+
+from recipes.constants import SHOPPING_CART_CHUNK_SIZE
+from recipes.models import (
+    IngredientInRecipe,
+    ShoppingCart,
+    ShoppingListItem,
+    User,
+)
+
+
+def get_recipe_amounts(recipe_id, sign=1):
+    """Количества ингредиентов рецепта: {id ингредиента: количество}."""
+    return {
+        ingredient_id: sign * amount
+        for ingredient_id, amount in IngredientInRecipe.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('ingredient_id', 'amount')
+    }
+
+
+@transaction.atomic
+def change_shopping_lists(user_ids, deltas):
+    """Изменение сводных списков покупок пользователей.
+
+    К количеству каждого ингредиента из `deltas` ({id ингредиента:
+    изменение}) в списках пользователей `user_ids` прибавляется
+    изменение, строки с нулевым количеством удаляются.
+    Строки пользователей блокируются в порядке id, поэтому параллельные
+    изменения списков одного пользователя выполняются по очереди
+    и не создают одну и ту же строку дважды.
+    """
+    deltas = {key: value for key, value in deltas.items() if value}
+    if not user_ids or not deltas:
+        return
+    list(
+        User.objects.select_for_update()
+        .filter(pk__in=user_ids)
+        .order_by('pk')
+        .values_list('pk', flat=True)
+    )
+    existing = {
+        (item.user_id, item.ingredient_id): item
+        for item in ShoppingListItem.objects.select_for_update().filter(
+            user_id__in=user_ids, ingredient_id__in=deltas
+        )
+    }
+    created, changed, removed = [], [], []
+    for user_id in user_ids:
+        for ingredient_id, delta in deltas.items():
+            item = existing.get((user_id, ingredient_id))
+            if item is None:
+                if delta > 0:
+                    created.append(
+                        ShoppingListItem(
+                            user_id=user_id,
+                            ingredient_id=ingredient_id,
+                            amount=delta,
+                        )
+                    )
+                continue
+            item.amount += delta
+            if item.amount > 0:
+                changed.append(item)
+            else:
+                removed.append(item.id)
+    if removed:
+        ShoppingListItem.objects.filter(id__in=removed).delete()
+    if changed:
+        ShoppingListItem.objects.bulk_update(changed, ('amount',))
+    ShoppingListItem.objects.bulk_create(created)
+
+
+def add_recipe(user_id, recipe_id):
+    """Добавление ингредиентов рецепта в список покупок пользователя."""
+    change_shopping_lists([user_id], get_recipe_amounts(recipe_id))
+
+
+def remove_recipe(user_id, recipe_id):
+    """Вычитание ингредиентов рецепта из списка покупок пользователя."""
+    change_shopping_lists([user_id], get_recipe_amounts(recipe_id, -1))
+
+
+def change_recipe(recipe_id, deltas):
+    """Изменение списков покупок всех, у кого рецепт в списке покупок."""
+    user_ids = ShoppingCart.objects.filter(recipe_id=recipe_id).values_list(
+        'user_id', flat=True
+    )
+    batch = []
+    for user_id in user_ids.iterator(chunk_size=SHOPPING_CART_CHUNK_SIZE):
+        batch.append(user_id)
+        if len(batch) == SHOPPING_CART_CHUNK_SIZE:
+            change_shopping_lists(batch, deltas)
+            batch = []
+    change_shopping_lists(batch, deltas)
+
+
+@contextmanager
+def recipes_changing(recipe_ids):
+    """Перенос изменений ингредиентов рецептов в сводные списки покупок.
+
+    Количества ингредиентов рецептов `recipe_ids` запоминаются до
+    выполнения блока, разница с количествами после него переносится
+    в списки покупок. Используется для изменений, которые делаются
+    не через API, например в админке.
+    """
+    before = {
+        recipe_id: get_recipe_amounts(recipe_id) for recipe_id in recipe_ids
+    }
+    yield
+    for recipe_id, amounts in before.items():
+        after = get_recipe_amounts(recipe_id)
+        change_recipe(
+            recipe_id,
+            {
+                ingredient_id: after.get(ingredient_id, 0)
+                - amounts.get(ingredient_id, 0)
+                for ingredient_id in amounts.keys() | after.keys()
+            },
+        )
+
+
+def get_expected_items():
+    """Списки покупок, вычисленные по рецептам в списках покупок.
+
+    Возвращает итератор кортежей (id пользователя, id ингредиента,
+    количество), упорядоченных по пользователю и ингредиенту.
+    """
+    return (
+        ShoppingCart.objects.filter(recipe__ingredients__isnull=False)
+        .values_list('user_id', 'recipe__ingredients__ingredient_id')
+        .annotate(total=Sum('recipe__ingredients__amount'))
+        .order_by('user_id', 'recipe__ingredients__ingredient_id')
+        .iterator(chunk_size=SHOPPING_CART_CHUNK_SIZE)
+    )
+
+
+def find_mismatches():
+    """Сравнение сводных списков покупок с вычисленными по рецептам.
+
+    Возвращает счетчик расхождений: отсутствующие, лишние
+    и отличающиеся по количеству строки.
+    """
+    mismatches = Counter()
+    stored = (
+        ShoppingListItem.objects.values_list(
+            'user_id', 'ingredient_id', 'amount'
+        )
+        .order_by('user_id', 'ingredient_id')
+        .iterator(chunk_size=SHOPPING_CART_CHUNK_SIZE)
+    )
+    expected = get_expected_items()
+    stored_row = next(stored, None)
+    expected_row = next(expected, None)
+    while stored_row is not None or expected_row is not None:
+        if stored_row is None or (
+            expected_row is not None and expected_row[:2] < stored_row[:2]
+        ):
+            mismatches['missing'] += 1
+            expected_row = next(expected, None)
+        elif expected_row is None or stored_row[:2] < expected_row[:2]:
+            mismatches['extra'] += 1
+            stored_row = next(stored, None)
+        else:
+            if stored_row[2] != expected_row[2]:
+                mismatches['amount'] += 1
+            stored_row = next(stored, None)
+            expected_row = next(expected, None)
+    return mismatches
+
+
+@transaction.atomic
+def rebuild_shopping_lists():
+    """Полное пересоздание сводных списков покупок по рецептам."""
+    ShoppingListItem.objects.all().delete()
+    batch = []
+    count = 0
+    for user_id, ingredient_id, amount in get_expected_items():
+        batch.append(
+            ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id, amount=amount
+            )
+        )
+        if len(batch) == SHOPPING_CART_CHUNK_SIZE:
+            ShoppingListItem.objects.bulk_create(batch)
+            count += len(batch)
+            batch = []
+    ShoppingListItem.objects.bulk_create(batch)
+    return count + len(batch)
@@ -0,0 +1,107 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from recipes import feed, shopping_list
+from recipes.cache import bump_version
+from recipes.images import delete_variants
+from recipes.constants import (
+    INGREDIENTS_CATALOG,
+    RECIPES_GENERATION,
+    TAGS_CATALOG,
+)
+from recipes.models import (
+    Favorites,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    RecipeTag,
+    ShoppingCart,
+    Tag,
+    User,
+)
+from recipes.utils import change_counter
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(**kwargs):
+    """Смена версии каталога ингредиентов после фиксации изменений.
+
+    Если сменить версию до фиксации транзакции, параллельный запрос
+    может закешировать старый каталог под новой версией.
+    """
+    transaction.on_commit(partial(bump_version, INGREDIENTS_CATALOG))
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(**kwargs):
+    """Смена версии каталога тегов после фиксации изменений."""
+    transaction.on_commit(partial(bump_version, TAGS_CATALOG))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(instance, **kwargs):
+    """Уменьшение счетчика рецептов автора и удаление копий изображения."""
+    change_counter(User, instance.author_id, 'recipes_count', -1)
+    if instance.image_variants:
+        transaction.on_commit(
+            partial(delete_variants, instance.image, instance.image_variants)
+        )
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(instance, **kwargs):
+    """Вычитание ингредиентов рецепта из сводных списков покупок."""
+    shopping_list.change_recipe(
+        instance.id, shopping_list.get_recipe_amounts(instance.id, -1)
+    )
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=IngredientInRecipe)
+@receiver((post_save, post_delete), sender=RecipeTag)
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=Ingredient)
+def recipe_data_changed(**kwargs):
+    """Смена версии данных рецептов для сброса кеша ответов.
+
+    Версия меняется после фиксации транзакции, иначе параллельный
+    запрос может закешировать старые данные под новой версией.
+    """
+    transaction.on_commit(partial(bump_version, RECIPES_GENERATION))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(instance, created, **kwargs):
+    """Увеличение счетчика рецептов автора и рассылка рецепта в ленты."""
+    if created:
+        change_counter(User, instance.author_id, 'recipes_count', 1)
+        transaction.on_commit(partial(feed.push_recipe, instance))
+
+
+@receiver(post_save, sender=Favorites)
+def favorite_saved(instance, created, **kwargs):
+    """Увеличение счетчика добавлений рецепта в избранное."""
+    if created:
+        change_counter(Recipe, instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=Favorites)
+def favorite_deleted(instance, **kwargs):
+    """Уменьшение счетчика добавлений рецепта в избранное."""
+    change_counter(Recipe, instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_saved(instance, created, **kwargs):
+    """Увеличение счетчика добавлений рецепта в списки покупок."""
+    if created:
+        change_counter(Recipe, instance.recipe_id, 'shopping_cart_count', 1)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def shopping_cart_deleted(instance, **kwargs):
+    """Уменьшение счетчика добавлений рецепта в списки покупок."""
+    change_counter(Recipe, instance.recipe_id, 'shopping_cart_count', -1)
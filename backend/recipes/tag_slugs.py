@@ -0,0 +1,21 @@
+from recipes.cache import VersionedSnapshot
+from recipes.constants import TAGS_CATALOG
+from recipes.models import Tag
+
+_slugs = VersionedSnapshot(
+    TAGS_CATALOG, lambda: dict(Tag.objects.values_list('slug', 'id'))
+)
+
+
+def get_tag_ids():
+    """Соответствие слагов тегов их id.
+
+    Хранится в памяти процесса и перечитывается из базы, если версия
+    каталога тегов в кеше изменилась.
+    """
+    return _slugs.get()
+
+
+def get_tag_choices():
+    """Варианты выбора тегов по слагу для фильтра рецептов."""
+    return [(slug, slug) for slug in get_tag_ids()]
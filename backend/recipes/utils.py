@@ -1,19 +1,56 @@
-import random
-import string
-
-from recipes.constants import LENGTH_SHORT_LINK
-from recipes.models import Recipe
-
-
-def generate_random_str(num: int = LENGTH_SHORT_LINK) -> str:
-    """Генерирование короткой ссылки."""
-    while True:
-        short_link = ''.join(
-            random.choice(
-                string.ascii_uppercase + string.ascii_lowercase + string.digits
-            )
-            for _ in range(num)
-        )
-        if not Recipe.objects.filter(short_link=short_link).exists():
-            break
-    return short_link
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from recipes.constants import (
+    LENGTH_SHORT_LINK,
+    SHORT_LINK_ALPHABET,
+    SHORT_LINK_MULTIPLIER,
+    SHORT_LINK_OFFSET,
+)
+
+SHORT_LINK_BASE = len(SHORT_LINK_ALPHABET)
+SHORT_LINK_MODULUS = SHORT_LINK_BASE ** LENGTH_SHORT_LINK
+SHORT_LINK_INVERSE = pow(SHORT_LINK_MULTIPLIER, -1, SHORT_LINK_MODULUS)
+
+
+def encode_short_link(pk: int) -> str:
+    """Короткая ссылка рецепта по его id.
+
+    Id взаимно однозначно перемешивается умножением и сдвигом по модулю
+    числа возможных ссылок и записывается в base62 фиксированной длины,
+    поэтому ссылка уникальна и не требует проверки в базе данных.
+    """
+    number = (pk * SHORT_LINK_MULTIPLIER + SHORT_LINK_OFFSET) % (
+        SHORT_LINK_MODULUS
+    )
+    chars = []
+    for _ in range(LENGTH_SHORT_LINK):
+        number, index = divmod(number, SHORT_LINK_BASE)
+        chars.append(SHORT_LINK_ALPHABET[index])
+    return ''.join(reversed(chars))
+
+
+def decode_short_link(short_link: str):
+    """Id рецепта по короткой ссылке или None для чужих ссылок."""
+    if len(short_link) != LENGTH_SHORT_LINK:
+        return None
+    number = 0
+    for char in short_link:
+        index = SHORT_LINK_ALPHABET.find(char)
+        if index < 0:
+            return None
+        number = number * SHORT_LINK_BASE + index
+    return (number - SHORT_LINK_OFFSET) * SHORT_LINK_INVERSE % (
+        SHORT_LINK_MODULUS
+    )
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарное изменение счетчика `field` объекта модели на `delta`.
+
+    Значение вычисляется в базе данных выражением F() и не опускается
+    ниже нуля.
+    """
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
@@ -0,0 +1,35 @@
+from django.http import Http404
+from django.shortcuts import redirect
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_safe
+
+from recipes.constants import SHORT_LINK_CACHE_MAX_AGE
+from recipes.models import Recipe
+from recipes.utils import decode_short_link
+
+
+@require_safe
+def short_link_view(request, surl):
+    """Функция перенаправления пользователей.
+
+    При переходе по короткой ссылке рецепта
+    пользователи перенаправляются на страцицу рецепта.
+    Обрабатывается без DRF, ответ разрешено кешировать браузерам
+    и прокси-серверу. Id рецепта вычисляется из короткой ссылки без
+    обращения к базе, несуществующий рецепт даст 404 на странице рецепта.
+    В базе по индексу ищутся только старые ссылки другого формата.
+    """
+    recipe_id = decode_short_link(surl)
+    if recipe_id is None:
+        recipe_id = (
+            Recipe.objects.filter(short_link=surl)
+            .values_list('id', flat=True)
+            .first()
+        )
+        if recipe_id is None:
+            raise Http404('Рецепт не найден.')
+    response = redirect('recipes-detail', pk=recipe_id)
+    patch_cache_control(
+        response, public=True, max_age=SHORT_LINK_CACHE_MAX_AGE
+    )
+    return response
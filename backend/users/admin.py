@@ -1,15 +1,14 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from django.db.models.query import QuerySet
-from django.http import HttpRequest
 
+from recipes.admin_utils import AutocompleteFilter, LargeTableAdminMixin
 from users.models import Follow, User
 
 admin.site.empty_value_display = '-пусто-'
 
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(LargeTableAdminMixin, BaseUserAdmin):
     """Админ для модели User с дополнительными полями."""
 
     list_display = (
@@ -19,22 +18,24 @@ class UserAdmin(BaseUserAdmin):
         'last_name',
         'email',
         'avatar',
+        'recipes_count',
+        'followers_count',
     )
     list_display_links = [
         'username',
         'email'
     ]
     search_fields = (
-        'username',
-        'email',
-        'first_name',
-        'last_name',
+        '^username',
+        '^email',
+        '^first_name',
+        '^last_name',
     )
     ordering = ('username',)
 
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """Админка для модели подписок."""
 
     list_display = (
@@ -46,14 +47,12 @@ class FollowAdmin(admin.ModelAdmin):
         'following',
     )
     search_fields = (
-        'user__username',
-        'following__username',
+        '^user__username',
+        '^following__username',
     )
     list_filter = (
-        'user',
-        'following',
+        ('user', AutocompleteFilter),
+        ('following', AutocompleteFilter),
     )
-
-    def get_queryset(self, request: HttpRequest) -> QuerySet:
-        qs = super().get_queryset(request)
-        return qs.select_related('user', 'following')
+    list_select_related = ('user', 'following')
+    autocomplete_fields = ('user', 'following')
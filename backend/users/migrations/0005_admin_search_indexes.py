@@ -0,0 +1,19 @@
+from django.db import migrations
+
+from recipes.migration_utils import upper_prefix_indexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_user_followers_count_user_recipes_count"),
+    ]
+
+    operations = [
+        upper_prefix_indexes(
+            (
+                ("users_user_username_upper_idx", "users_user", "username"),
+                ("users_user_email_upper_idx", "users_user", "email"),
+            )
+        ),
+    ]
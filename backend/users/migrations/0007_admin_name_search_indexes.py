@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from recipes.migration_utils import upper_prefix_indexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0006_user_avatar_variants"),
+    ]
+
+    operations = [
+        upper_prefix_indexes(
+            (
+                (
+                    "users_user_first_name_upper_idx",
+                    "users_user",
+                    "first_name",
+                ),
+                ("users_user_last_name_upper_idx", "users_user", "last_name"),
+            )
+        ),
+    ]
@@ -1,9 +1,16 @@
+from functools import partial
+
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
-from django.db import models
+from django.db import models, transaction
 
 from recipes import constants
+from recipes.images import (
+    delete_variants,
+    refresh_variants,
+    schedule_variants,
+)
 
 
 class User(AbstractUser):
@@ -47,6 +54,18 @@ class User(AbstractUser):
     avatar = models.ImageField(
         'аватар', upload_to='users/', blank=True, null=True
     )
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов', default=0, editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков', default=0, editable=False
+    )
+    avatar_variants = models.JSONField(
+        'уменьшенные копии аватара',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = [
         'username',
@@ -67,6 +86,18 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    def save(self, *args, **kwargs):
+        stale_variants, avatar_changed = refresh_variants(
+            self, 'avatar', 'avatar_variants', kwargs
+        )
+        super().save(*args, **kwargs)
+        if stale_variants:
+            transaction.on_commit(
+                partial(delete_variants, self.avatar, stale_variants)
+            )
+        if avatar_changed:
+            schedule_variants(self, 'avatar', 'avatar_variants')
+
 
 class Follow(models.Model):
     """Подписки пользователей.
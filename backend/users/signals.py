@@ -0,0 +1,40 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes import feed
+from recipes.images import delete_variants
+from recipes.utils import change_counter
+from users.models import Follow, User
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(instance, created, **kwargs):
+    """Увеличение счетчика подписчиков автора и заполнение ленты."""
+    if created:
+        change_counter(User, instance.following_id, 'followers_count', 1)
+        transaction.on_commit(
+            partial(feed.add_author, instance.user_id, instance.following_id)
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(instance, **kwargs):
+    """Уменьшение счетчика подписчиков автора и очистка ленты."""
+    change_counter(User, instance.following_id, 'followers_count', -1)
+    transaction.on_commit(
+        partial(feed.remove_author, instance.user_id, instance.following_id)
+    )
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(instance, **kwargs):
+    """Удаление копий аватара удаленного пользователя."""
+    if instance.avatar_variants:
+        transaction.on_commit(
+            partial(
+                delete_variants, instance.avatar, instance.avatar_variants
+            )
+        )